@@ -5,63 +5,145 @@ Ranks reports based on their estimated urgency upon request via gRPC.
 import logging
 import os
 import sys
+import threading
 import time
 from concurrent import futures
 from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import grpc
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # pylint: disable=wrong-import-position
 import protos.ranking_pb2 as pb2
 import protos.ranking_pb2_grpc as pb2_grpc
+from issue_api.metrics import CONTENT_TYPE, MetricsRegistry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+metrics = MetricsRegistry()
+RPCS = metrics.counter("ranking_service_rpcs_total", "Ranking RPCs by method", ("method",))
+RANKING_DURATION = metrics.histogram(
+    "ranking_service_ranking_duration_seconds", "Time spent ranking one request"
+)
+REPORTS_RANKED = metrics.counter("ranking_service_reports_ranked_total", "Reports ranked")
+FAILURES = metrics.counter(
+    "ranking_service_failures_total", "Ranking requests answered with success=false"
+)
+
+
+def parse_report_time(timestamp, current_time):
+    """Returns the report timestamp in whole UTC seconds, or current_time if it is invalid."""
+    try:
+        return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
+    except ValueError:
+        return current_time
+
+
+def report_columns(request):
+    """Returns the ids, timestamps, upvote counts and comment counts of the reports
+    in a request as lists, whether it holds Report messages or packed columns."""
+    # pylint: disable=no-member
+    if request.reports:
+        return tuple(map(list, zip(*(
+            (report.id, report.timestamp, report.upvote_count, report.comment_count)
+            for report in request.reports
+        ))))
+    columns = (list(request.report_ids), list(request.timestamps),
+               list(request.upvote_counts), list(request.comment_counts))
+    if len({len(column) for column in columns}) > 1:
+        raise ValueError("report columns differ in length")
+    return columns
+
 
 class RankingService(pb2_grpc.RankingServiceServicer):
     """Provides methods that implement functionality of ranking server."""
 
-    def calculate_urgency(self, timestamp, upvotes, comments):
+    def calculate_urgency(self, timestamp, upvotes, comments, current_time=None):
         """Ranks an issue report based on its estimated urgency."""
-        current_time = int(time.time())
-        try:
-            report_time = int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
-        except ValueError:
-            report_time = current_time
+        if current_time is None:
+            current_time = int(time.time())
+        report_time = parse_report_time(timestamp, current_time)
 
         age_in_seconds = max(1, current_time - report_time)
 
         score = upvotes / (age_in_seconds / 3600) * (1.2 ** comments)
         return float(score)
 
+    def calculate_urgency_batch(self, timestamps, upvotes, comments, current_time=None):
+        """Ranks a batch of reports in one pass with NumPy.
+        Gives the same scores as calculate_urgency for every report."""
+        if current_time is None:
+            current_time = int(time.time())
+        try:
+            parsed = np.array(timestamps, dtype="datetime64[us]")
+            report_times = parsed.astype("datetime64[s]").astype(np.int64)
+            report_times[np.isnat(parsed)] = current_time
+        except ValueError:
+            report_times = np.array(
+                [parse_report_time(timestamp, current_time) for timestamp in timestamps],
+                dtype=np.int64
+            )
+        upvotes = np.asarray(upvotes, dtype=np.float64)
+        comments = np.asarray(comments, dtype=np.float64)
+
+        age_in_hours = np.maximum(1, current_time - report_times) / 3600
+        return upvotes / age_in_hours * np.power(1.2, comments)
+
     def CalculateRanking(self, request, context):
         """Urgency ranking function called by the Main API."""
-        logger.info("Received ranking request for %d reports", len(request.reports))
-
-        rankings = []
+        RPCS.inc(method="CalculateRanking")
+        return self._rank(request)
+
+    def _rank(self, request):
+        start = time.perf_counter()
+        response = self._calculate(request)
+        RANKING_DURATION.observe(time.perf_counter() - start)
+        if response.success:
+            # Only one of the two forms is filled
+            REPORTS_RANKED.inc(len(response.rankings) + len(response.report_ids))
+        else:
+            FAILURES.inc()
+        return response
+
+    def _calculate(self, request):
         # pylint: disable=no-member
+        response = pb2.RankingResponse(success=True, message="")
+        current_time = int(time.time())
         try:
-            for report in request.reports:
-                score = self.calculate_urgency(
-                    report.timestamp,
-                    report.upvote_count,
-                    report.comment_count
-                )
-
-                rankings.append(
-                    pb2.Ranking(report_id=report.id, score=score)
-                )
-
-            logger.info("Successfully ranked %d reports", len(rankings))
-
-            return pb2.RankingResponse(
-                success=True,
-                message="",
-                rankings=rankings
-            )
+            report_ids, timestamps, upvotes, comments = report_columns(request)
+            logger.info("Received ranking request for %d reports", len(report_ids))
+            if np is not None and report_ids:
+                scores = self.calculate_urgency_batch(
+                    timestamps, upvotes, comments, current_time
+                ).tolist()
+            else:
+                scores = [
+                    self.calculate_urgency(timestamp, upvote_count, comment_count, current_time)
+                    for timestamp, upvote_count, comment_count
+                    in zip(timestamps, upvotes, comments)
+                ]
+
+            # Answer in the form of the request
+            if request.reports:
+                for report_id, score in zip(report_ids, scores):
+                    response.rankings.add(report_id=report_id, score=score)
+            else:
+                response.report_ids.extend(report_ids)
+                response.scores.extend(scores)
+
+            logger.info("Successfully ranked %d reports", len(report_ids))
+
+            return response
 
         except (ValueError, TypeError) as e:
             logger.error("Data processing error: %s", e)
@@ -70,6 +152,40 @@ class RankingService(pb2_grpc.RankingServiceServicer):
             logger.error("gRPC error: %s", e)
             return pb2.RankingResponse(success=False, message="Communication error")
 
+    def StreamRanking(self, request_iterator, context):
+        """Streaming urgency ranking function called by the Main API.
+        Every chunk of reports is answered with the rankings of that chunk."""
+        RPCS.inc(method="StreamRanking")
+        for request in request_iterator:
+            yield self._rank(request)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the metrics of the ranking service in the Prometheus text format."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Returns the metrics on /metrics."""
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serves the metrics over HTTP in a background thread."""
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("Metrics served on port %d", server.server_address[1])
+    return server
+
 
 def serve():
     """Starts the gRPC server."""
@@ -80,6 +196,7 @@ def serve():
     logger.info("Ranking Service Server started on port 50051")
 
     server.start()
+    start_metrics_server()
     server.wait_for_termination()
 
 
@@ -0,0 +1,317 @@
+"""Load test replaying API traffic against a seeded database.
+
+Seeds a temporary database with the seed-db generator, starts a stub
+ranking service on port 50051 and serves the app from a separate process,
+with the Werkzeug threaded server or with gunicorn. Client threads then send
+a weighted mix of list, feed, item, create, upvote and comment requests, or
+replay a recorded NDJSON trace, and the number of requests per second and
+the latency percentiles are reported per route.
+
+    python -m benchmarks.loadtest --reports 10000 --clients 8 --duration 10
+    python -m benchmarks.loadtest --gunicorn "-w 4 --threads 2"
+    python -m benchmarks.loadtest --trace trace.ndjson --json results.json
+
+Every line of a trace is a JSON object with a method, a path and an optional
+json body, for example {"method": "GET", "path": "/api/reports/?limit=25"}.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import re
+import secrets
+import shlex
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent import futures
+
+import grpc
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from issue_api import create_app, db
+from issue_api.models import ApiKey, User, generate_seed_records, import_records
+from issue_api.utils import API_KEY_HEADER
+from protos import ranking_pb2 as pb2
+from protos import ranking_pb2_grpc as pb2_grpc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "list=40,feed=10,item=30,create=5,upvote=10,comment=5"
+RANKING_PORT = 50051
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class StubRankingService(pb2_grpc.RankingServiceServicer):
+    """Ranking service that answers at once, scoring reports by activity."""
+
+    def _rank(self, request):
+        return pb2.RankingResponse(success=True, report_ids=request.report_ids, scores=[
+            upvote_count + comment_count
+            for upvote_count, comment_count in zip(request.upvote_counts, request.comment_counts)
+        ])
+
+    def CalculateRanking(self, request, context):
+        return self._rank(request)
+
+    def StreamRanking(self, request_iterator, context):
+        for request in request_iterator:
+            yield self._rank(request)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request."""
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+def parse_mix(value):
+    """Returns the request mix given as name=weight pairs."""
+    mix = {}
+    for pair in value.split(","):
+        name, weight = pair.split("=")
+        if name not in ("list", "feed", "item", "create", "upvote", "comment"):
+            raise argparse.ArgumentTypeError(f"unknown request type '{name}'")
+        mix[name] = float(weight)
+    return mix
+
+
+def seed_database(config, reports, clients, seed):
+    """Seeds the database and returns a (user id, API key) pair per client."""
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        import_records(generate_seed_records(reports, seed=seed))
+        users = []
+        for number in range(clients):
+            key = secrets.token_urlsafe()
+            user = User(name=f"load-client-{number}")
+            db.session.add(ApiKey(key=ApiKey.key_hash(key), admin=False, user=user))
+            users.append((user, key))
+        db.session.commit()
+        return [(user.id, key) for user, key in users]
+
+
+def _serve(config, port):
+    app = create_app(config)
+    make_server("127.0.0.1", port, app, threaded=True,
+                request_handler=QuietRequestHandler).serve_forever()
+
+
+def start_server(config, port, gunicorn_args=None):
+    """Starts the app in a separate process and waits until it answers."""
+    if gunicorn_args is None:
+        process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(config, port), daemon=True
+        )
+        process.start()
+    else:
+        process = subprocess.Popen(
+            ["gunicorn", "-b", f"127.0.0.1:{port}", *shlex.split(gunicorn_args),
+             f"issue_api:create_app({config!r})"],
+            cwd=ROOT,
+        )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/api/rankings/")
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The app did not start within 30 seconds")
+
+
+def stop_server(process):
+    """Stops a process started by start_server."""
+    process.terminate()
+    if isinstance(process, subprocess.Popen):
+        process.wait(10)
+    else:
+        process.join(10)
+
+
+def start_ranking_stub(port=RANKING_PORT):
+    """Starts the stub ranking service on localhost."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    pb2_grpc.add_RankingServiceServicer_to_server(StubRankingService(), server)
+    server.add_insecure_port(f"localhost:{port}")
+    server.start()
+    return server
+
+
+def mix_requests(mix, reports, user_id, rng):
+    """Yields (route, method, path, body) tuples following the request mix."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while True:
+        name = rng.choices(names, weights)[0]
+        report_id = rng.randint(1, reports)
+        if name == "list":
+            yield name, "GET", "/api/reports/?limit=25", None
+        elif name == "feed":
+            yield name, "GET", "/api/reports/?sort=urgency&limit=25", None
+        elif name == "item":
+            yield name, "GET", f"/api/reports/{report_id}/", None
+        elif name == "create":
+            yield name, "POST", "/api/reports/", {
+                "report_type_id": rng.randint(1, 10),
+                "description": f"Load test report {rng.randrange(10 ** 6)}",
+                "location": "Main St.",
+            }
+        elif name == "upvote":
+            yield name, "POST", f"/api/reports/{report_id}/upvote/{user_id}/", None
+        else:
+            yield name, "POST", f"/api/reports/{report_id}/comments/", {"text": "Load test"}
+
+
+def trace_requests(trace, offset):
+    """Yields (route, method, path, body) tuples from a trace, starting at offset."""
+    for index in range(offset, offset + 2 ** 62):
+        record = trace[index % len(trace)]
+        method = record.get("method", "GET").upper()
+        route = re.sub(r"/\d+(?=/)", "/<id>", record["path"].split("?")[0])
+        yield f"{method} {route}", method, record["path"], record.get("json")
+
+
+def run_client(port, requests, api_key, deadline, results):
+    """Sends requests over one keep-alive connection until the deadline.
+
+    Appends (route, start time, latency, status) tuples to results, with
+    status 0 for connection errors.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for route, method, path, body in requests:
+        start = time.perf_counter()
+        if start >= deadline:
+            break
+        headers = {API_KEY_HEADER: api_key}
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            status = 0
+        results.append((route, start, time.perf_counter() - start, status))
+    connection.close()
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(results, duration):
+    """Returns request rate, latency percentiles in ms and errors per route."""
+    routes = defaultdict(list)
+    for route, _start, latency, status in results:
+        routes[route].append((latency, status))
+        routes["total"].append((latency, status))
+    summary = {}
+    for route, samples in sorted(routes.items(), key=lambda item: item[0] == "total"):
+        latencies = sorted(latency for latency, _status in samples)
+        summary[route] = {
+            "requests": len(samples),
+            "rps": len(samples) / duration,
+            **{f"p{int(fraction * 100)}": percentile(latencies, fraction) * 1000
+               for fraction in PERCENTILES},
+            "4xx": sum(1 for _latency, status in samples if 400 <= status < 500),
+            "5xx": sum(1 for _latency, status in samples if status >= 500 or status == 0),
+        }
+    return summary
+
+
+def print_summary(summary):
+    """Prints a summary as a table."""
+    columns = ["requests", "rps", "p50", "p95", "p99", "4xx", "5xx"]
+    width = max(len(route) for route in summary) + 2
+    print(f"{'route':<{width}}" + "".join(f"{column:>10}" for column in columns))
+    for route, row in summary.items():
+        cells = [f"{row['requests']:>10}", f"{row['rps']:>10.1f}"]
+        cells += [f"{row[column]:>8.2f}ms" for column in ("p50", "p95", "p99")]
+        cells += [f"{row['4xx']:>10}", f"{row['5xx']:>10}"]
+        print(f"{route:<{width}}" + "".join(cells))
+
+
+def main():
+    """Seeds a database, starts the app and runs the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=10000, help="reports to seed")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"request weights (default {DEFAULT_MIX})")
+    parser.add_argument("--trace", help="NDJSON trace to replay instead of the mix")
+    parser.add_argument("--gunicorn", metavar="ARGS",
+                        help='serve with gunicorn and these arguments, e.g. "-w 4"')
+    parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    args = parser.parse_args()
+
+    trace = None
+    if args.trace:
+        with open(args.trace, encoding="utf-8") as file:
+            trace = [json.loads(line) for line in file if line.strip()]
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(directory, "load.db")}
+        print(f"Seeding {args.reports} reports...")
+        users = seed_database(config, args.reports, args.clients, args.seed)
+
+        port = _free_port()
+        server = start_server(config, port, args.gunicorn)
+        ranking_stub = start_ranking_stub()
+        try:
+            print(f"Running {args.clients} clients for {args.warmup + args.duration:g} s...")
+            results = []
+            start = time.perf_counter()
+            deadline = start + args.warmup + args.duration
+            threads = []
+            for number, (user_id, api_key) in enumerate(users):
+                if trace is None:
+                    requests = mix_requests(args.mix, args.reports, user_id,
+                                            random.Random(args.seed + number))
+                else:
+                    requests = trace_requests(trace, number * len(trace) // args.clients)
+                threads.append(threading.Thread(
+                    target=run_client, args=(port, requests, api_key, deadline, results)
+                ))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            stop_server(server)
+            ranking_stub.stop(None)
+
+    measured = [result for result in results if result[1] >= start + args.warmup]
+    summary = summarize(measured, args.duration)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"options": vars(args), "routes": summary}, file, indent=2)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Cold start time of the app per SWAGGER_MODE.
+
+Every sample is a fresh Python process that imports issue_api and calls
+create_app, as a gunicorn worker does when it boots. The import time, the
+create_app time and the wall time of the whole process are reported.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --modes dynamic,prebuilt
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("dynamic", "prebuilt", "disabled")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import issue_api
+imported = time.perf_counter()
+issue_api.create_app(json.loads(sys.argv[1]))
+print(json.dumps({"import": imported - start, "create_app": time.perf_counter() - imported}))
+"""
+
+
+def run_once(config):
+    """Returns the import, create_app and process times of one cold start."""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, json.dumps(config)],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    """Measures cold starts in every mode and prints the medians."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="cold starts per mode")
+    parser.add_argument("--modes", default=",".join(MODES), help="modes to measure")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        base = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(directory, "startup.db"),
+                "OPENAPI_SPEC_FILE": os.path.join(directory, "openapi.json")}
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "issue_api", "export-openapi",
+             "--output", base["OPENAPI_SPEC_FILE"]],
+            cwd=ROOT, check=True, capture_output=True,
+        )
+        print(f"{'mode':<12}{'import':>12}{'create_app':>12}{'process':>12}")
+        for mode in args.modes.split(","):
+            samples = [run_once({**base, "SWAGGER_MODE": mode}) for _ in range(args.runs)]
+            medians = [statistics.median(sample[key] for sample in samples) * 1000
+                       for key in ("import", "create_app", "process")]
+            print(f"{mode:<12}" + "".join(f"{median:>10.1f}ms" for median in medians))
+
+
+if __name__ == "__main__":
+    main()
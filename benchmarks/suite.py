@@ -0,0 +1,326 @@
+"""Microbenchmarks of the API hot paths with JSON baselines.
+
+Times report serialization, authentication, URL converters, JSON schema
+validation, building the ranking requests in rpc_client, a whole
+update_rankings run and RankingService.CalculateRanking. The sized
+benchmarks run against seeded databases of each of the given sizes.
+
+Every result is the fastest of --repeat rounds, and each round times every
+benchmark of a database once, so that a slow spell of the machine costs
+one round of several benchmarks rather than every round of one. Results
+are compared with a baseline file, and every benchmark more than
+--threshold and more than --min-delta seconds slower than its baseline is
+flagged, in which case the exit status is 1. The absolute floor keeps timer
+noise in the microsecond benchmarks from being flagged. On shared machines
+whole runs can be half again as slow as others, so compare there with a
+higher --threshold. Baselines depend on the machine, so they are not
+committed; save them where the comparison runs:
+
+    python -m benchmarks.suite --save
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 100,1000 --filter rankings
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import timeit
+from contextlib import contextmanager
+
+from issue_api import create_app, db, rpc_client
+from issue_api.models import (
+    ApiKey,
+    Comment,
+    Report,
+    User,
+    generate_seed_records,
+    import_records,
+)
+from issue_api.utils import (
+    API_KEY_HEADER,
+    ReportConverter,
+    UserByNameConverter,
+    _authenticate,
+    get_schema_validator,
+    load_json_schema,
+    SchemaValidator,
+)
+from auxiliary_service import server
+from auxiliary_service.server import RankingService
+from protos import ranking_pb2 as pb2
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = "100,1000,10000,100000"
+DEFAULT_REPEAT = 7
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 10e-6
+API_KEY = "benchmark-key"
+REPORT_JSON = {"report_type_id": 1, "description": "Large pothole", "location": "Main St."}
+
+# (name, sized, setup) where setup(app, size) returns the function to time
+BENCHMARKS = []
+
+
+def benchmark(name, sized=False):
+    """Registers a benchmark setup function."""
+    def decorator(setup):
+        BENCHMARKS.append((name, sized, setup))
+        return setup
+    return decorator
+
+
+class DirectRankingStub:
+    """Ranking stub calling a RankingService in this process instead of over gRPC."""
+
+    def __init__(self):
+        self.service = RankingService()
+
+    def StreamRanking(self, requests):
+        return self.service.StreamRanking(requests, None)
+
+    def CalculateRanking(self, request):
+        return self.service.CalculateRanking(request, None)
+
+
+def _load_reports(count):
+    reports = db.session.scalars(
+        db.select(Report)
+        .options(db.joinedload(Report.report_type), db.joinedload(Report.user),
+                 db.selectinload(Report.comments).joinedload(Comment.user))
+        .limit(count)
+    ).all()
+    # Detached objects are not expired by the commits of the rankings.update
+    # rounds, which would make serializing them refresh every row
+    db.session.expunge_all()
+    return reports
+
+
+def _ranking_request(app):
+    merged = pb2.RankingRequest()
+    for request in rpc_client._ranking_requests(app, True, 1000):
+        merged.MergeFrom(request)
+    return merged
+
+
+@benchmark("serialize.short_x1000")
+def bench_serialize_short(_app, _size):
+    reports = _load_reports(1000)
+    return lambda: [report.serialize(short_form=True) for report in reports]
+
+
+@benchmark("serialize.long_x1000")
+def bench_serialize_long(_app, _size):
+    reports = _load_reports(1000)
+    return lambda: [report.serialize(short_form=False) for report in reports]
+
+
+@benchmark("auth.cached")
+def bench_auth_cached(app, _size):
+    context = app.test_request_context(headers={API_KEY_HEADER: API_KEY})
+
+    def run():
+        with context:
+            return _authenticate()
+    return run
+
+
+@benchmark("auth.uncached")
+def bench_auth_uncached(app, _size):
+    user_id = db.session.scalar(db.select(User.id).where(User.name == "benchmark-user"))
+    context = app.test_request_context(headers={API_KEY_HEADER: API_KEY})
+
+    def run():
+        app.extensions["auth_cache"].invalidate_user(user_id)
+        with context:
+            return _authenticate()
+    return run
+
+
+@benchmark("converter.report")
+def bench_converter_report(app, size):
+    converter = ReportConverter(app.url_map)
+    report_id = str(size // 2)
+    return lambda: converter.to_python(report_id)
+
+
+@benchmark("converter.user_by_name")
+def bench_converter_user(app, _size):
+    converter = UserByNameConverter(app.url_map)
+    return lambda: converter.to_python("seed-user-1")
+
+
+@benchmark("validation.report")
+def bench_validation(_app, _size):
+    validator = get_schema_validator("report.json")
+    return lambda: validator.validate(REPORT_JSON)
+
+
+@benchmark("validation.report_generic")
+def bench_validation_generic(_app, _size):
+    validator = SchemaValidator(load_json_schema("report.json"))
+    validator.fast_path = None
+    return lambda: validator.validate(REPORT_JSON)
+
+
+@benchmark("rankings.requests", sized=True)
+def bench_ranking_requests(app, _size):
+    chunk_size = app.config["RANKING_CHUNK_SIZE"]
+    return lambda: [request.SerializeToString()
+                    for request in rpc_client._ranking_requests(app, True, chunk_size)]
+
+
+@benchmark("rankings.update", sized=True)
+def bench_update_rankings(_app, _size):
+    return lambda: rpc_client.update_rankings(full=True)
+
+
+@benchmark("ranking_service.calculate", sized=True)
+def bench_calculate(app, _size):
+    service = RankingService()
+    request = _ranking_request(app)
+    return lambda: service.CalculateRanking(request, None)
+
+
+@benchmark("ranking_service.calculate_python", sized=True)
+def bench_calculate_python(app, _size):
+    service = RankingService()
+    request = _ranking_request(app)
+
+    def run():
+        numpy, server.np = server.np, None
+        try:
+            return service.CalculateRanking(request, None)
+        finally:
+            server.np = numpy
+    return run
+
+
+@contextmanager
+def seeded_app(directory, size):
+    """Yields an app context of a database seeded with the given number of reports."""
+    path = os.path.join(directory, f"bench-{size}.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + path})
+    with app.app_context():
+        db.create_all()
+        import_records(generate_seed_records(size, seed=0))
+        db.session.add(ApiKey(key=ApiKey.key_hash(API_KEY), admin=False,
+                              user=User(name="benchmark-user")))
+        db.session.commit()
+        yield app
+
+
+def measure(funcs, repeat=DEFAULT_REPEAT):
+    """Returns the best time in seconds of a single call of each function by name.
+
+    The rounds of the functions are interleaved.
+    """
+    timers = {}
+    for name, func in funcs.items():
+        timer = timeit.Timer(func)
+        number, _elapsed = timer.autorange()
+        timers[name] = (timer, number)
+    best = {}
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            seconds = timer.timeit(number) / number
+            best[name] = min(seconds, best.get(name, seconds))
+    return best
+
+
+def run_benchmarks(sizes, name_filter=None, repeat=DEFAULT_REPEAT):
+    """Runs the benchmarks and returns the seconds per call by name."""
+    results = {}
+    get_ranking_stub = rpc_client.get_ranking_stub
+    rpc_client.get_ranking_stub = DirectRankingStub
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for size in sizes:
+                with seeded_app(directory, size) as app:
+                    funcs = {}
+                    for name, sized, setup in BENCHMARKS:
+                        # Unsized benchmarks run once, against the largest database
+                        if not sized and size != max(sizes):
+                            continue
+                        key = f"{name}[{size}]" if sized else name
+                        if name_filter and name_filter not in key:
+                            continue
+                        funcs[key] = setup(app, size)
+                    for key, seconds in measure(funcs, repeat).items():
+                        results[key] = seconds
+                        print(f"{key:<45}{_format(seconds):>12}", file=sys.stderr)
+    finally:
+        rpc_client.get_ranking_stub = get_ranking_stub
+    return results
+
+
+def _format(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(results, baselines, threshold, min_delta=DEFAULT_MIN_DELTA):
+    """Prints the results next to their baselines and returns the slower names."""
+    slower = []
+    print(f"{'benchmark':<45}{'time':>12}{'baseline':>12}{'change':>10}")
+    for name, seconds in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<45}{_format(seconds):>12}{'-':>12}{'-':>10}")
+            continue
+        change = seconds / baseline - 1
+        flag = ""
+        if change > threshold and seconds - baseline > min_delta:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<45}{_format(seconds):>12}{_format(baseline):>12}{change:>+10.0%}{flag}")
+    return slower
+
+
+def main():
+    """Runs the suite and compares it with, or saves it as, the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"database sizes in reports (default {DEFAULT_SIZES})")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true",
+                        help="store the results in the baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="flag benchmarks slower than the baseline by this fraction "
+                             f"(default {DEFAULT_THRESHOLD:g})")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="ignore slowdowns of fewer seconds than this "
+                             f"(default {DEFAULT_MIN_DELTA:g})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"rounds per benchmark, the fastest counts (default {DEFAULT_REPEAT})")
+    args = parser.parse_args()
+
+    # The ranking service logs every request
+    server.logger.setLevel(logging.WARNING)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    results = run_benchmarks(sizes, args.filter, args.repeat)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baselines = json.load(file)
+    slower = compare(results, baselines, args.threshold, args.min_delta)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif slower:
+        print(f"{len(slower)} benchmarks are more than {args.threshold:.0%} slower "
+              "than their baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Microbenchmark of JSON schema validation cost per request.
+
+Compares calling jsonschema.validate, which checks the schema and builds a
+validator on every call, with the cached validators from
+issue_api.utils.get_schema_validator, with and without the fast path.
+
+    python -m benchmarks.validation [--number N]
+"""
+
+import argparse
+import timeit
+
+from jsonschema import validate
+
+from issue_api.utils import SchemaValidator, get_schema_validator, load_json_schema
+
+DOCUMENTS = {
+    "report.json": {
+        "report_type_id": 1,
+        "description": "Large pothole on Main St.",
+        "location": "Main St.",
+    },
+    "comment.json": {"text": "Still there this morning"},
+    "user.json": {"name": "john_doe", "api_key": "0123456789abcdef"},
+    "report_type.json": {"name": "pothole", "description": "Street surface damage"},
+}
+
+
+def main():
+    """Prints the time of a single validation for each schema and method."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000,
+                        help="validations per measurement")
+    args = parser.parse_args()
+
+    print(f"{'schema':<18}{'validate()':>14}{'cached':>14}{'fast path':>14}")
+    for file_name, document in DOCUMENTS.items():
+        schema = load_json_schema(file_name)
+        generic = SchemaValidator(schema)
+        generic.fast_path = None
+        cached = get_schema_validator(file_name)
+        methods = [
+            lambda: validate(document, schema),
+            lambda: generic.validate(document),
+            lambda: cached.validate(document),
+        ]
+        results = []
+        for method in methods:
+            seconds = min(timeit.repeat(method, number=args.number, repeat=3))
+            results.append(f"{seconds / args.number * 1e6:.2f} us")
+        print(f"{file_name:<18}" + "".join(f"{result:>14}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,52 @@
 """Package initialization for the issue API."""
 
+import json
+import logging
 import os
+import time
 
 from flasgger import Swagger
 from flask import Flask
 
 from .extensions import db
+from .ranking_worker import RankingWorker
+
+logger = logging.getLogger(__name__)
+
+DOC_DIR = os.path.join(os.path.dirname(__file__), "doc")
+
+
+def _init_swagger(app):
+    """Sets up the API docs as configured by SWAGGER_MODE.
+
+    "dynamic" builds the spec from the YAML docs, "prebuilt" serves the spec
+    written by the export-openapi command and "disabled" serves no docs.
+    """
+    app.config["SWAGGER"] = {
+        "title": "Issue API",
+        "openapi": "3.0.3",
+        "uiversion": 3,
+    }
+    mode = app.config["SWAGGER_MODE"]
+    if mode == "disabled":
+        return
+    if mode == "prebuilt":
+        try:
+            with open(app.config["OPENAPI_SPEC_FILE"], encoding="utf-8") as file:
+                spec = json.load(file)
+        except OSError as err:
+            logger.warning("Building the API docs, prebuilt spec not found: %s", err)
+        else:
+            # Leave out every route so that the YAML docs are never read
+            config = dict(Swagger.DEFAULT_CONFIG, specs=[{
+                "endpoint": Swagger.DEFAULT_ENDPOINT,
+                "route": f"/{Swagger.DEFAULT_ENDPOINT}.json",
+                "rule_filter": lambda rule: False,
+                "model_filter": lambda tag: True,
+            }])
+            Swagger(app, config=config, template=spec)
+            return
+    Swagger(app, template_file=os.path.join(DOC_DIR, "base.yml"))
 
 
 # Based on http://flask.pocoo.org/docs/1.0/tutorial/factory/#the-application-factory
@@ -13,11 +54,33 @@ from .extensions import db
 def create_app(test_config=None):
     """Creates and configures a Flask application instance using
     the application factory pattern."""
+    started_at = time.perf_counter()
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
         SECRET_KEY="dev",
         SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(app.instance_path, "test.db"),
-        SQLALCHEMY_TRACK_MODIFICATIONS=False
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        RANKING_UPDATE_MODE="background",
+        RANKING_UPDATE_DELAY=1.0,
+        RANKING_FULL_SWEEP_INTERVAL=3600,
+        RANKING_CHUNK_SIZE=1000,
+        AUTH_CACHE_SIZE=1024,
+        AUTH_CACHE_TTL=30,
+        SQLITE_PRAGMAS={
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 268435456,
+            "cache_size": -65536,
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+        SQLITE_MAINTENANCE_INTERVAL=600,
+        REQUEST_TIMING=False,
+        SLOW_REQUEST_THRESHOLD=1.0,
+        METRICS_DIR=os.environ.get("METRICS_DIR"),
+        METRICS_FLUSH_INTERVAL=1.0,
+        SWAGGER_MODE=os.environ.get("SWAGGER_MODE", "dynamic"),
+        OPENAPI_SPEC_FILE=os.path.join(DOC_DIR, "openapi.json"),
     )
 
     if test_config is None:
@@ -31,17 +94,17 @@ def create_app(test_config=None):
         pass
 
     db.init_app(app)
+    app.extensions["ranking_worker"] = RankingWorker(app)
+    app.before_request(app.extensions["ranking_worker"].ensure_started)
 
-    app.config["SWAGGER"] = {
-        "title": "Issue API",
-        "openapi": "3.0.3",
-        "uiversion": 3,
-    }
-    Swagger(app, template_file=os.path.join(os.path.dirname(__file__), "doc", "base.yml"))
+    _init_swagger(app)
 
     from . import api  # pylint: disable=import-outside-toplevel
+    from . import metrics  # pylint: disable=import-outside-toplevel
     from . import models  # pylint: disable=import-outside-toplevel
+    from . import timing  # pylint: disable=import-outside-toplevel
     from .utils import ( # pylint: disable=import-outside-toplevel
+        AuthCache,
         ReportTypeConverter,
         ReportConverter,
         CommentConverter,
@@ -49,9 +112,22 @@ def create_app(test_config=None):
         UserByNameConverter
     )
 
+    app.extensions["auth_cache"] = AuthCache(app.config["AUTH_CACHE_SIZE"],
+                                             app.config["AUTH_CACHE_TTL"])
+    with app.app_context():
+        models.configure_sqlite_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
+        timing.init_app(app, db.engine)
+        metrics.init_app(app, db.engine)
+
     app.cli.add_command(models.init_db)
     app.cli.add_command(models.reset_db)
+    app.cli.add_command(models.migrate_db)
+    app.cli.add_command(models.optimize_db)
+    app.cli.add_command(models.rebuild_counts)
+    app.cli.add_command(models.import_data)
+    app.cli.add_command(models.seed_db)
     app.cli.add_command(models.create_admin_user)
+    app.cli.add_command(api.export_openapi)
 
     app.url_map.converters["report_type"] = ReportTypeConverter
     app.url_map.converters["report"] = ReportConverter
@@ -61,4 +137,9 @@ def create_app(test_config=None):
 
     app.register_blueprint(api.api_bp)
 
+    # CPU time covers the imports too, and starts over in forked gunicorn workers
+    startup = time.perf_counter() - started_at
+    app.extensions["metrics"].startup.set(startup, pid=os.getpid())
+    logger.info("Created the app in %.3f s, %.3f s of CPU time since the process started",
+                startup, time.process_time())
     return app
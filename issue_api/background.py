@@ -0,0 +1,43 @@
+"""Daemon threads that run once in every process that needs them."""
+
+import os
+import threading
+
+
+class BackgroundThread:
+    """Runs a loop in a daemon thread of its own in each process.
+
+    Threads do not survive a fork, so a process forked from one running the
+    thread, such as a gunicorn worker, starts its own on ensure_running. The
+    loop should return once the stopped event is set.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def is_alive(self):
+        """Returns whether the thread is running in this process."""
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def ensure_running(self):
+        """Starts the thread in this process if it is not running."""
+        if self.is_alive():
+            return
+        with self._lock:
+            if self.is_alive():
+                return
+            self.stopped.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Sets the stopped event and waits for the thread to finish."""
+        self.stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,338 @@
+"""Counters, gauges and histograms exposed in the Prometheus text format.
+
+Every process records its metrics in memory. Given a directory, each process
+also writes its metrics to a file of its own there, every flush_interval
+seconds from a background thread and when it exits, and collecting merges
+the files of all processes so that any gunicorn worker can report the
+metrics of every worker. Counters and histograms of exited processes keep
+counting towards the totals, gauges only count for running processes. The
+directory should be emptied when the service starts.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from glob import glob
+
+from flask import current_app, g, request
+
+from .background import BackgroundThread
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, lock, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = lock
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def values(self):
+        """Returns the values of the metric by label values."""
+        with self._lock:
+            return {key: _copy(value) for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """Increments the count of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally read with a callback when collected.
+
+    The callback returns a value, or a dict of values by label value tuples.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, lock, name, description, labels=(), callback=None):
+        super().__init__(lock, name, description, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        """Sets the value of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def values(self):
+        if self.callback is None:
+            return super().values()
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return values
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in buckets with upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(self, lock, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(lock, name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Adds a value to the distribution of the given label values."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Count per bucket, then the +Inf bucket and the sum
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+
+class MetricsRegistry:
+    """Metrics of a process, merged with those of other processes sharing a directory."""
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = BackgroundThread(self._flush_loop, "metrics-flush")
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description, labels=()):
+        """Registers and returns a counter."""
+        return self._add(Counter(self._lock, name, description, labels))
+
+    def gauge(self, name, description, labels=(), callback=None):
+        """Registers and returns a gauge."""
+        return self._add(Gauge(self._lock, name, description, labels, callback))
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        """Registers and returns a histogram."""
+        return self._add(Histogram(self._lock, name, description, labels, buckets))
+
+    def snapshot(self):
+        """Returns the metrics of this process in a JSON serializable form."""
+        return {
+            metric.name: {
+                "kind": metric.kind,
+                "description": metric.description,
+                "labels": list(metric.labels),
+                "buckets": list(getattr(metric, "buckets", [])),
+                "values": [[list(key), value] for key, value in metric.values().items()],
+            }
+            for metric in self._metrics.values()
+        }
+
+    def flush(self):
+        """Writes the metrics of this process to its file in the directory."""
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        with self._flush_lock:
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(self.snapshot(), file)
+            os.replace(path + ".tmp", path)
+
+    def ensure_flushing(self):
+        """Starts the thread flushing the metrics every flush_interval seconds in this process."""
+        if self.directory is not None:
+            self._thread.ensure_running()
+
+    def stop(self, timeout=None):
+        """Stops the flushing thread."""
+        self._thread.stop(timeout)
+
+    def _flush_loop(self):
+        # pylint: disable=broad-exception-caught
+        while not self._thread.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush metrics")
+
+    def collect(self):
+        """Returns the metrics of all processes, merged by name."""
+        if self.directory is None:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in sorted(glob(os.path.join(self.directory, "metrics-*.json"))):
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            try:
+                with open(path, encoding="utf-8") as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            running = _is_running(pid)
+            for name, metric in snapshot.items():
+                if metric["kind"] == "gauge" and not running:
+                    continue
+                target = merged.setdefault(name, {**metric, "values": []})
+                target["values"] = _merge(target["values"], metric["values"])
+        return merged
+
+    def render(self):
+        """Returns the metrics of all processes in the Prometheus text format."""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {_escape_help(metric['description'])}")
+            lines.append(f"# TYPE {name} {metric['kind']}")
+            for key, value in sorted(metric["values"]):
+                labels = list(zip(metric["labels"], key))
+                if metric["kind"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*metric["buckets"], "+Inf"], value[:-1]):
+                    cumulative += count
+                    bound = bound if bound == "+Inf" else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', bound)])} "
+                                 f"{cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+def _merge(values, other):
+    merged = {tuple(key): value for key, value in values}
+    for key, value in other:
+        key = tuple(key)
+        if key not in merged:
+            merged[key] = _copy(value)
+        elif isinstance(value, list):
+            merged[key] = [total + count for total, count in zip(merged[key], value)]
+        else:
+            merged[key] += value
+    return [[list(key), value] for key, value in merged.items()]
+
+
+def _is_running(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = (
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _pool_status(pool, attribute):
+    # Pools of in-memory SQLite databases do not count their connections
+    def callback():
+        method = getattr(pool, attribute, None)
+        return method() if method is not None else 0
+    return callback
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _finish_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    metrics = current_app.extensions["metrics"]
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    metrics.requests.inc(method=request.method, route=route, status=response.status_code)
+    metrics.request_duration.observe(time.perf_counter() - start,
+                                     method=request.method, route=route)
+    metrics.registry.ensure_flushing()
+    return response
+
+
+class ApiMetrics:
+    """Metrics of the issue API."""
+
+    def __init__(self, registry, engine):
+        self.registry = registry
+        self.requests = registry.counter(
+            "issue_api_requests_total", "HTTP requests by method, route and status",
+            ("method", "route", "status"),
+        )
+        self.request_duration = registry.histogram(
+            "issue_api_request_duration_seconds", "HTTP request latency by method and route",
+            ("method", "route"),
+        )
+        self.ranking_rpc_duration = registry.histogram(
+            "issue_api_ranking_rpc_duration_seconds",
+            "Time spent waiting for the ranking service per ranking update",
+        )
+        self.ranking_rpc_failures = registry.counter(
+            "issue_api_ranking_rpc_failures_total",
+            "Failed ranking service calls by gRPC status code, UNSUCCESSFUL for "
+            "responses with success=false", ("code",),
+        )
+        self.auth_cache = registry.counter(
+            "issue_api_auth_cache_requests_total",
+            "API key lookups by whether they were found in the auth cache", ("result",),
+        )
+        self.startup = registry.gauge(
+            "issue_api_startup_seconds", "Time taken by create_app per worker process", ("pid",),
+        )
+        registry.gauge("issue_api_db_pool_size", "Connections kept in the database pool",
+                       callback=_pool_status(engine.pool, "size"))
+        registry.gauge("issue_api_db_pool_checked_out", "Database connections in use",
+                       callback=_pool_status(engine.pool, "checkedout"))
+
+
+def init_app(app, engine):
+    """Registers the metrics of the app in app.extensions["metrics"] and its request hooks."""
+    registry = MetricsRegistry(app.config["METRICS_DIR"], app.config["METRICS_FLUSH_INTERVAL"])
+    app.extensions["metrics"] = ApiMetrics(registry, engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
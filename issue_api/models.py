@@ -1,17 +1,26 @@
 """Data models for the issue API."""
 
+import gzip
 import hashlib
+import json
+import random
 import secrets
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 
 import click
 from flask.cli import with_appcontext
 from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
 
 from .extensions import db
 
+# Shown in place of the user of reports and comments whose user was deleted
+DELETED_USER_NAME = "Deleted user"
 
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, _):
@@ -20,21 +29,54 @@ def set_sqlite_pragma(dbapi_connection, _):
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
+def configure_sqlite_pragmas(engine, pragmas):
+    """Applies the given PRAGMA settings to every new connection of a SQLite engine."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_configured_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def optimize_sqlite(checkpoint_mode="PASSIVE"):
+    """Checkpoints the write-ahead log and refreshes SQLite query planner statistics."""
+    if db.engine.dialect.name != "sqlite":
+        return
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA wal_checkpoint({checkpoint_mode})")
+        connection.exec_driver_sql("PRAGMA optimize")
+
 upvotes = db.Table("upvotes",
     db.Column("report_id", db.Integer, db.ForeignKey("report.id"), primary_key=True),
-    db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
+    db.Index("ix_upvotes_user_id", "user_id"),
 )
 
 class Report(db.Model):
     """Report model."""
 
+    __table_args__ = (
+        db.Index("ix_report_timestamp_id", "timestamp", "id"),
+        db.Index("ix_report_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        db.Index("ix_report_urgency_score_id", "urgency_score", "id"),
+        db.Index("ix_report_ranking_dirty", "id", sqlite_where=db.text("ranking_dirty = 1")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"))
-    report_type_id = db.Column(db.Integer, db.ForeignKey("report_type.id", ondelete="SET NULL"))
+    report_type_id = db.Column(db.Integer, db.ForeignKey("report_type.id", ondelete="SET NULL"),
+                               index=True)
     description = db.Column(db.String(128), nullable=False)
     location = db.Column(db.String(64), nullable=False)
     urgency_score = db.Column(db.Float)
+    upvote_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ranking_dirty = db.Column(db.Boolean, nullable=False, default=True, server_default="1")
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     user = db.relationship("User", back_populates="reports", passive_deletes=True)
     report_type = db.relationship("ReportType", back_populates="reports", passive_deletes=True)
@@ -52,19 +94,19 @@ class Report(db.Model):
         if self.report_type:
             report_type = self.report_type.serialize(True)
 
-        user_name = "Deleted user"
+        user_name = DELETED_USER_NAME
         if self.user:
             user_name = self.user.name
         doc = {
             "id": self.id,
-            "timestamp": str(self.timestamp),
+            "timestamp": self.timestamp,
             "user_name": user_name,
             "report_type": report_type,
             "description": self.description,
             "location": self.location,
             "urgency_score": self.urgency_score,
-            "upvote_count": len(self.upvoted_by),
-            "comment_count": len(self.comments),
+            "upvote_count": self.upvote_count,
+            "comment_count": self.comment_count,
         }
         if not short_form:
             doc["comments"] = [comment.serialize() for comment in self.comments]
@@ -100,7 +142,7 @@ class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     report_id = db.Column(db.Integer, db.ForeignKey("report.id", ondelete="CASCADE"),
-                          nullable=False)
+                          nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"))
     text = db.Column(db.String(128), nullable=False)
 
@@ -113,13 +155,13 @@ class Comment(db.Model):
 
     def serialize(self):
         """Turns the object into a dictionary."""
-        user = "Deleted user"
+        user = DELETED_USER_NAME
         if self.user:
             user = self.user.serialize()
 
         return {
             "id": self.id,
-            "timestamp": str(self.timestamp),
+            "timestamp": self.timestamp,
             "user": user,
             "text": self.text,
         }
@@ -170,6 +212,73 @@ class ApiKey(db.Model):
             "admin": self.admin,
         }
 
+class TableVersion(db.Model):
+    """Table version model, a counter that changes whenever a table changes."""
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+VERSIONED_TABLES = ("report", "report_type", "user")
+
+def bump_table_versions(connection, names):
+    """Increments the versions of the given tables.
+
+    A missing version starts from the current time in microseconds, so
+    versions do not repeat after the database has been recreated.
+    """
+    for name in names:
+        statement = sqlite_insert(TableVersion).values(name=name, version=time.time_ns() // 1000)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": TableVersion.version + 1},
+        ))
+
+def get_table_versions(names):
+    """Returns the current versions of the given tables."""
+    rows = db.session.execute(
+        db.select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(names))
+    ).all()
+    versions = dict(rows)
+    return tuple(versions.get(name, 0) for name in names)
+
+@event.listens_for(Session, "before_flush")
+def bump_versions(session, _flush_context, _instances):
+    """Increments the row version of every modified report and the versions
+    of the tables changed by the flush."""
+    names = set()
+    for obj in session.new | session.deleted:
+        names.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            names.add(obj.__table__.name)
+            if isinstance(obj, Report):
+                obj.version = Report.version + 1
+    names.intersection_update(VERSIONED_TABLES)
+    if names:
+        bump_table_versions(session.connection(), sorted(names))
+
+class RankingState(db.Model):
+    """Ranking state model, a single row describing the latest ranking update."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    refreshed_at = db.Column(db.DateTime)
+    full_sweep_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def get():
+        """Returns the ranking state row, creating it if needed."""
+        state = db.session.get(RankingState, 1)
+        if state is None:
+            state = RankingState(id=1)
+            db.session.add(state)
+        return state
+
+    def serialize(self):
+        """Turns the object into a dictionary."""
+        return {
+            "last_refreshed": self.refreshed_at,
+        }
+
 def add_default_report_types():
     """Adds default report types to the database."""
     default_report_types = [
@@ -192,6 +301,302 @@ def add_default_report_types():
         db.session.rollback()
         print(f"Failed to add default report types: {err}")
 
+def update_report_counts():
+    """Recalculates the denormalized upvote and comment counters of all reports."""
+    upvote_count = (
+        db.select(db.func.count())
+        .select_from(upvotes)
+        .where(upvotes.c.report_id == Report.id)
+        .scalar_subquery()
+    )
+    comment_count = (
+        db.select(db.func.count(Comment.id))
+        .where(Comment.report_id == Report.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        db.update(Report).values(upvote_count=upvote_count, comment_count=comment_count,
+                                 version=Report.version + 1)
+    )
+    bump_table_versions(db.session.connection(), ["report"])
+    db.session.commit()
+
+def migrate_schema():
+    """Adds missing tables, columns and indexes to an existing database
+    without dropping any data. Returns a description of every change."""
+    changes = []
+    with db.engine.begin() as connection:
+        inspector = db.inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                table.create(connection)
+                changes.append(f"table {table.name}")
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                    changes.append(f"column {table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    changes.append(f"index {index.name}")
+
+    if "column report.upvote_count" in changes or "column report.comment_count" in changes:
+        update_report_counts()
+    return changes
+
+# Per-connection settings for bulk loading, trading crash safety for speed
+IMPORT_SQLITE_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+def _parse_import_timestamp(value):
+    """Returns an imported timestamp as a naive UTC datetime."""
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    timestamp = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def _import_string(record, key, max_length, required=True):
+    """Returns a string field of an imported record, checking its length."""
+    value = record.get(key)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or len(value) > max_length:
+        raise ValueError(f"'{key}' must be a string of at most {max_length} characters")
+    return value
+
+class BulkImporter:
+    """Imports users, report types, reports, comments and upvotes from records.
+
+    Users and report types are referenced by name and resolved with
+    in-memory maps. Ids are allocated here, so rows of every table can be
+    inserted with a driver level executemany without reading ids back.
+    Reports keep the id of their record if they have one, which lets
+    comments refer to them with report_id. Records are buffered and inserted
+    with flush, parents before children, and every flush is committed as
+    its own transaction.
+    """
+
+    TABLES = (User.__table__, ReportType.__table__, Report.__table__, Comment.__table__, upvotes)
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.user_ids = dict(connection.execute(db.select(User.name, User.id)).all())
+        self.report_type_ids = dict(
+            connection.execute(db.select(ReportType.name, ReportType.id)).all()
+        )
+        self.next_ids = {
+            table.name: (connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0) + 1
+            for table in self.TABLES if "id" in table.c
+        }
+        self.pending = {table.name: [] for table in self.TABLES}
+        # Timestamps are stored in the same format as through the ORM
+        timestamp_type = Report.__table__.c.timestamp.type.dialect_impl(connection.dialect)
+        self.bind_timestamp = timestamp_type.bind_processor(connection.dialect) or (
+            lambda value: value
+        )
+        self.counts = dict.fromkeys(self.pending, 0)
+        self.buffered = 0
+        self.skipped = []
+        self.missing_reports = 0
+        self.handlers = {
+            "user": self._add_user,
+            "report_type": self._add_report_type,
+            "report": self._add_report,
+            "comment": self._add_comment,
+            "upvote": self._add_upvote,
+        }
+
+    def _allocate_id(self, table_name, record_id=None):
+        if record_id is None:
+            record_id = self.next_ids[table_name]
+        elif not isinstance(record_id, int):
+            raise ValueError("'id' must be an integer")
+        self.next_ids[table_name] = max(self.next_ids[table_name], record_id + 1)
+        return record_id
+
+    def _buffer(self, table_name, row):
+        self.pending[table_name].append(row)
+        self.buffered += 1
+
+    def _user_id(self, record):
+        # Reports and comments of deleted users are exported without a user
+        name = record.get("user_name")
+        if name is None or (name == DELETED_USER_NAME and name not in self.user_ids):
+            return None
+        if name not in self.user_ids:
+            raise ValueError(f"unknown user '{name}'")
+        return self.user_ids[name]
+
+    def _add_user(self, record):
+        name = _import_string(record, "name", 32)
+        if name not in self.user_ids:
+            self.user_ids[name] = self._allocate_id("user")
+            self._buffer("user", {"id": self.user_ids[name], "name": name})
+
+    def _add_report_type(self, record):
+        name = _import_string(record, "name", 32)
+        if name not in self.report_type_ids:
+            self.report_type_ids[name] = self._allocate_id("report_type")
+            self._buffer("report_type", {
+                "id": self.report_type_ids[name],
+                "name": name,
+                "description": _import_string(record, "description", 128, required=False),
+            })
+
+    def _add_report(self, record):
+        # Accepts the reports written by the export endpoint
+        report_type = record.get("report_type")
+        if isinstance(report_type, dict):
+            report_type = report_type.get("name")
+        if report_type is not None and report_type not in self.report_type_ids:
+            raise ValueError(f"unknown report type '{report_type}'")
+        urgency_score = record.get("urgency_score")
+        if urgency_score is not None and not isinstance(urgency_score, (int, float)):
+            raise ValueError("'urgency_score' must be a number")
+        self._buffer("report", {
+            "id": self._allocate_id("report", record.get("id")),
+            "timestamp": self.bind_timestamp(_parse_import_timestamp(record.get("timestamp"))),
+            "user_id": self._user_id(record),
+            "report_type_id": self.report_type_ids.get(report_type),
+            "description": _import_string(record, "description", 128),
+            "location": _import_string(record, "location", 64),
+            "urgency_score": urgency_score,
+            "upvote_count": 0,
+            "comment_count": 0,
+            "ranking_dirty": True,
+            "version": 1,
+        })
+
+    def _add_comment(self, record):
+        report_id = record.get("report_id")
+        if not isinstance(report_id, int):
+            raise ValueError("'report_id' must be an integer")
+        self._buffer("comment", {
+            "id": self._allocate_id("comment"),
+            "timestamp": self.bind_timestamp(_parse_import_timestamp(record.get("timestamp"))),
+            "report_id": report_id,
+            "user_id": self._user_id(record),
+            "text": _import_string(record, "text", 128),
+        })
+
+    def _add_upvote(self, record):
+        report_id = record.get("report_id")
+        if not isinstance(report_id, int):
+            raise ValueError("'report_id' must be an integer")
+        user_id = self._user_id(record)
+        if user_id is None:
+            raise ValueError(f"unknown user '{record.get('user_name')}'")
+        self._buffer("upvotes", {"report_id": report_id, "user_id": user_id})
+
+    def add(self, record):
+        """Buffers a record.
+
+        The record type is given by its type field, and records without one
+        are reports. Raises ValueError, KeyError or TypeError for invalid
+        records.
+        """
+        if not isinstance(record, dict):
+            raise ValueError("record must be a JSON object")
+        handler = self.handlers.get(record.get("type", "report"))
+        if handler is None:
+            raise ValueError(f"unknown record type '{record.get('type')}'")
+        handler(record)
+
+    def skip(self, line_number, error):
+        """Records an invalid line that was not imported."""
+        self.skipped.append((line_number, str(error)))
+
+    def flush(self):
+        """Inserts and commits all buffered records.
+
+        Comments and upvotes of reports that do not exist are dropped and
+        counted in missing_reports. Duplicate upvotes are ignored and not
+        counted.
+        """
+        for table in self.TABLES:
+            rows = self.pending[table.name]
+            if rows and "report_id" in table.c:
+                # Reports are inserted first, so this also sees this batch
+                report_ids = {row["report_id"] for row in rows}
+                existing = set(self.connection.execute(
+                    db.select(Report.id).where(Report.id.in_(report_ids))
+                ).scalars())
+                valid_rows = [row for row in rows if row["report_id"] in existing]
+                self.missing_reports += len(rows) - len(valid_rows)
+                rows = valid_rows
+            if rows:
+                columns = list(rows[0])
+                verb = "INSERT OR IGNORE" if table is upvotes else "INSERT"
+                result = self.connection.exec_driver_sql(
+                    f"{verb} INTO {table.name} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(':' + column for column in columns)})",
+                    rows,
+                )
+                # Ignored duplicate upvotes are not counted as inserted
+                self.counts[table.name] += result.rowcount if result.rowcount >= 0 else len(rows)
+            self.pending[table.name] = []
+        self.connection.commit()
+        self.buffered = 0
+
+    @property
+    def imported(self):
+        """Returns the number of records inserted so far."""
+        return sum(self.counts.values())
+
+def import_records(lines, batch_size=10000, progress=None):
+    """Imports records from an iterable of NDJSON lines or of dictionaries
+    with a BulkImporter.
+
+    Runs with IMPORT_SQLITE_PRAGMAS on its connection, flushes every
+    batch_size records and calls progress with the importer after each
+    flush. Returns the importer. Report counters and table versions are
+    updated even if a batch fails, since the batches before it stay committed.
+    """
+    try:
+        with db.engine.connect() as connection:
+            original_pragmas = {}
+            if connection.dialect.name == "sqlite":
+                for name, value in IMPORT_SQLITE_PRAGMAS.items():
+                    original_pragmas[name] = (
+                        connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                    )
+                    connection.exec_driver_sql(f"PRAGMA {name}={value}")
+            try:
+                importer = BulkImporter(connection)
+                for line_number, line in enumerate(lines, 1):
+                    if isinstance(line, str) and not line.strip():
+                        continue
+                    try:
+                        importer.add(json.loads(line) if isinstance(line, str) else line)
+                    except (ValueError, KeyError, TypeError) as err:
+                        importer.skip(line_number, err)
+                    if importer.buffered >= batch_size:
+                        importer.flush()
+                        if progress:
+                            progress(importer)
+                importer.flush()
+            finally:
+                connection.rollback()
+                for name, value in original_pragmas.items():
+                    connection.exec_driver_sql(f"PRAGMA {name}={value}")
+    finally:
+        update_report_counts()
+        bump_table_versions(db.session.connection(), ["user", "report_type"])
+        db.session.commit()
+    optimize_sqlite()
+    return importer
+
 @click.command("init-db")
 @with_appcontext
 def init_db():
@@ -211,6 +616,149 @@ def reset_db():
     db.create_all()
     print("Database reset complete.")
 
+@click.command("migrate-db")
+@with_appcontext
+def migrate_db():
+    """Adds missing tables, columns and indexes to the database."""
+    print("Migrating database...")
+    changes = migrate_schema()
+    for change in changes:
+        print(f"Added {change}")
+    if not changes:
+        print("Database is up to date.")
+    print("Database migration complete.")
+
+@click.command("optimize-db")
+@with_appcontext
+def optimize_db():
+    """Truncates the write-ahead log and runs PRAGMA optimize."""
+    print("Optimizing database...")
+    optimize_sqlite(checkpoint_mode="TRUNCATE")
+    print("Database optimized.")
+
+@click.command("rebuild-counts")
+@with_appcontext
+def rebuild_counts():
+    """Rebuilds the upvote and comment counters of all reports."""
+    print("Rebuilding report counters...")
+    update_report_counts()
+    print("Report counters rebuilt.")
+
+SEED_LOCATIONS = ("Main St.", "Elm St.", "Oak Ave.", "Station Rd.", "Harbour Rd.",
+                  "Market Sq.", "Park Lane", "Mill St.", "Church St.", "River Rd.")
+
+def generate_seed_records(reports=10000, users=None, report_types=10, seed=0,
+                          end=None, days=90):
+    """Yields a synthetic dataset as records for BulkImporter.
+
+    Apart from the end time, which defaults to now, the dataset only depends
+    on the arguments. Reports are spread evenly over the given number of days
+    and a few users write most of them. Upvote counts follow a Pareto
+    distribution, so that most reports have none while a few hot reports get
+    thousands, and comment counts follow the upvotes.
+    """
+    rng = random.Random(seed)
+    users = users or max(reports // 10, 1)
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    start = end - timedelta(days=days)
+
+    user_names = [f"seed-user-{number}" for number in range(1, users + 1)]
+    for name in user_names:
+        yield {"type": "user", "name": name}
+    type_names = [f"seed-type-{number}" for number in range(1, report_types + 1)]
+    for name in type_names:
+        yield {"type": "report_type", "name": name, "description": f"Seeded {name}"}
+
+    for report_id in range(1, reports + 1):
+        yield {
+            "type": "report",
+            "id": report_id,
+            "timestamp": start + timedelta(days=days * report_id / reports),
+            "user_name": user_names[int(users * rng.random() ** 3)],
+            "report_type": type_names[int(report_types * rng.random() ** 2)],
+            "description": f"Seeded report {report_id}",
+            "location": f"{rng.randrange(1, 200)} {rng.choice(SEED_LOCATIONS)}",
+        }
+        upvote_count = min(int(rng.paretovariate(1.2)) - 1, users)
+        for user_index in rng.sample(range(users), upvote_count):
+            yield {"type": "upvote", "report_id": report_id, "user_name": user_names[user_index]}
+        comment_count = int(upvote_count * rng.random() * 0.5) + (rng.random() < 0.2)
+        for number in range(comment_count):
+            yield {
+                "type": "comment",
+                "report_id": report_id,
+                "user_name": user_names[rng.randrange(users)],
+                "text": f"Seeded comment {number + 1} on report {report_id}",
+            }
+
+def _print_import_progress(start):
+    """Returns a progress callback for import_records that prints the rate."""
+    def progress(importer):
+        elapsed = time.perf_counter() - start
+        print(f"Imported {importer.imported} records ({importer.imported / elapsed:.0f} records/s)")
+    return progress
+
+def _print_import_summary(importer, start):
+    """Prints what import_records imported and skipped."""
+    elapsed = time.perf_counter() - start
+    counts = importer.counts
+    print(f"Imported {counts['user']} users, {counts['report_type']} report types, "
+          f"{counts['report']} reports, {counts['comment']} comments and "
+          f"{counts['upvotes']} upvotes in {elapsed:.1f} s "
+          f"({importer.imported / elapsed:.0f} records/s)")
+    for line_number, error in importer.skipped:
+        print(f"Skipped line {line_number}: {error}")
+    if importer.missing_reports:
+        print(f"Skipped {importer.missing_reports} comments and upvotes of missing reports")
+
+@click.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=10000, show_default=True,
+              help="Records inserted per transaction")
+@with_appcontext
+def import_data(path, batch_size):
+    """Imports users, report types, reports, comments and upvotes from an NDJSON file.
+
+    Every line is a JSON object with a type of user, report_type, report,
+    comment or upvote; lines without a type are reports, so files written by
+    the export endpoint can be imported as they are. Records must come after
+    the records they refer to. Files ending in .gz are decompressed on the fly.
+    """
+    print("Importing records...")
+    start = time.perf_counter()
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as file:
+            importer = import_records(file, batch_size, _print_import_progress(start))
+    except IntegrityError as err:
+        raise click.ClickException(
+            f"Import failed, the current batch was rolled back: {err.orig}") from err
+    _print_import_summary(importer, start)
+    print("Import complete.")
+
+@click.command("seed-db")
+@click.option("--reports", default=10000, show_default=True, help="Number of reports")
+@click.option("--users", type=int, help="Number of users  [default: reports / 10]")
+@click.option("--report-types", default=10, show_default=True, help="Number of report types")
+@click.option("--days", default=90, show_default=True, help="Days the reports are spread over")
+@click.option("--end", type=click.DateTime(), help="Time of the newest report  [default: now]")
+@click.option("--seed", default=0, show_default=True, help="Random seed")
+@with_appcontext
+def seed_db(reports, users, report_types, days, end, seed):
+    """Recreates the database with a synthetic dataset for scale testing.
+
+    The same options always give the same dataset; pass --end as well to
+    also fix the timestamps.
+    """
+    print("Seeding database...")
+    db.drop_all()
+    db.create_all()
+    start = time.perf_counter()
+    records = generate_seed_records(reports, users, report_types, seed, end, days)
+    importer = import_records(records, progress=_print_import_progress(start))
+    _print_import_summary(importer, start)
+    print("Database seeded.")
+
 @click.command("create-admin-user")
 @click.option("--name", default="admin", help="Admin user name")
 @with_appcontext
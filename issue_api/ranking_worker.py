@@ -0,0 +1,103 @@
+"""Background worker that recalculates report rankings outside of requests."""
+
+import logging
+import threading
+import time
+
+from flask import current_app
+
+from .background import BackgroundThread
+from .extensions import db
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+class RankingWorker:
+    """Runs ranking updates in a background thread.
+
+    Requests only mark an update as pending. The worker thread waits for
+    RANKING_UPDATE_DELAY seconds after being woken up so that a burst of
+    requests is coalesced into a single ranking update. Without requests the
+    thread still wakes up every RANKING_FULL_SWEEP_INTERVAL seconds so that
+    time decay gets applied to all scores. As the thread doing most of the
+    writes, it also checkpoints and optimizes the SQLite database every
+    SQLITE_MAINTENANCE_INTERVAL seconds.
+    """
+
+    def __init__(self, app, update_func=None, maintenance_func=None):
+        # pylint: disable=import-outside-toplevel
+        if maintenance_func is None:
+            from .models import optimize_sqlite
+            maintenance_func = optimize_sqlite
+        self.app = app
+        self.update_func = update_func
+        self.maintenance_func = maintenance_func
+        self._pending = threading.Event()
+        self._thread = BackgroundThread(self._loop, "ranking-worker")
+
+    def request_update(self):
+        """Schedules a ranking update."""
+        if self.app.config["RANKING_UPDATE_MODE"] == "inline":
+            self.run_update()
+            return
+        self._thread.ensure_running()
+        self._pending.set()
+
+    def run_update(self):
+        """Runs a single ranking update in the current thread.
+
+        grpc and the protos are imported by the first update rather than at
+        startup.
+        """
+        # pylint: disable=import-outside-toplevel
+        from grpc import RpcError
+        if self.update_func is None:
+            from .rpc_client import update_rankings
+            self.update_func = update_rankings
+        try:
+            with timed("ranking"):
+                self.update_func()
+        except RpcError as err:
+            # RPC server unavailable
+            db.session.rollback()
+            logger.warning("Ranking update failed: %s", err)
+
+    def stop(self, timeout=None):
+        """Stops the worker thread after its current update."""
+        self._thread.stopped.set()
+        self._pending.set()
+        self._thread.stop(timeout)
+
+    def ensure_started(self):
+        """Starts the worker thread in this process if it is not running."""
+        if self.app.config["RANKING_UPDATE_MODE"] == "inline":
+            return
+        self._thread.ensure_running()
+
+    def _loop(self):
+        # pylint: disable=broad-exception-caught
+        config = self.app.config
+        maintained_at = time.monotonic()
+        while True:
+            self._pending.wait(min(config["RANKING_FULL_SWEEP_INTERVAL"],
+                                   config["SQLITE_MAINTENANCE_INTERVAL"]))
+            if self._thread.stopped.wait(config["RANKING_UPDATE_DELAY"]):
+                return
+            self._pending.clear()
+            with self.app.app_context():
+                try:
+                    self.run_update()
+                except Exception:
+                    logger.exception("Unexpected error in ranking update")
+                if time.monotonic() - maintained_at >= config["SQLITE_MAINTENANCE_INTERVAL"]:
+                    maintained_at = time.monotonic()
+                    try:
+                        self.maintenance_func()
+                    except Exception:
+                        logger.exception("Unexpected error in database maintenance")
+
+
+def schedule_ranking_update():
+    """Schedules a ranking update with the worker of the current app."""
+    current_app.extensions["ranking_worker"].request_update()
@@ -3,15 +3,21 @@
 from flasgger import swag_from
 from flask import Response, request, url_for
 from flask_restful import Resource
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from werkzeug.exceptions import BadRequest
 
 from issue_api import db
-from issue_api.models import Comment, Report
-from issue_api.utils import load_json_schema, require_api_key, require_owner_or_admin, get_doc_path
+from issue_api.models import Comment, Report, bump_table_versions
+from issue_api.utils import (
+    get_schema_validator,
+    require_api_key,
+    require_owner_or_admin,
+    get_doc_path,
+)
+from ..ranking_worker import schedule_ranking_update
 
 
-SCHEMA = load_json_schema("comment.json")
+VALIDATOR = get_schema_validator("comment.json")
 
 class CommentCollection(Resource):
     """Resource for comment collection."""
@@ -21,17 +27,20 @@ class CommentCollection(Resource):
     def post(self, auth_user, report: Report):
         """Create a new comment."""
         try:
-            validate(request.json, SCHEMA)
+            VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
         comment = Comment()
         comment.deserialize(json_dict=request.json)
 
-        comment.user = auth_user
+        comment.user_id = auth_user.id
         comment.report = report
+        report.comment_count = Report.comment_count + 1
+        report.ranking_dirty = True
         db.session.add(comment)
         db.session.commit()
+        schedule_ranking_update()
 
         return Response(status=201, headers={
             "Location": url_for("api.commentitem", comment=comment)
@@ -44,6 +53,14 @@ class CommentItem(Resource):
     @require_owner_or_admin("comment", "user_id")
     def delete(self, comment: Comment, **_kwargs):
         """Delete a comment."""
+        db.session.execute(
+            db.update(Report)
+            .where(Report.id == comment.report_id)
+            .values(comment_count=Report.comment_count - 1, ranking_dirty=True,
+                    version=Report.version + 1)
+        )
+        bump_table_versions(db.session.connection(), ["report"])
         db.session.delete(comment)
         db.session.commit()
+        schedule_ranking_update()
         return Response(status=204)
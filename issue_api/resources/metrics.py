@@ -0,0 +1,19 @@
+"""Resource for the service metrics of the issue API."""
+
+from flasgger import swag_from
+from flask import Response, current_app
+from flask_restful import Resource
+
+from issue_api.metrics import CONTENT_TYPE
+from issue_api.utils import get_doc_path, require_admin
+
+
+class Metrics(Resource):
+    """Resource for request, database, ranking and auth cache metrics."""
+
+    @swag_from(get_doc_path("metrics/get.yml"))
+    @require_admin
+    def get(self, **_kwargs):
+        """Get the metrics of all workers in the Prometheus text format."""
+        registry = current_app.extensions["metrics"].registry
+        return Response(registry.render(), content_type=CONTENT_TYPE)
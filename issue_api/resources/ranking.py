@@ -0,0 +1,18 @@
+"""Resources for report rankings in the issue API."""
+
+from flasgger import swag_from
+from flask_restful import Resource
+
+from issue_api import db
+from issue_api.models import RankingState
+from issue_api.utils import get_doc_path
+
+
+class RankingStatus(Resource):
+    """Resource for the status of report urgency rankings."""
+
+    @swag_from(get_doc_path("rankingstatus/get.yml"))
+    def get(self):
+        """Get when the urgency scores were last refreshed."""
+        state = db.session.get(RankingState, 1) or RankingState()
+        return state.serialize()
@@ -1,18 +1,92 @@
 """Resources for reports in the issue API."""
 
+import zlib
+from datetime import datetime, timezone
+
 from flasgger import swag_from
-from flask import Response, request, url_for
+from flask import Response, request, stream_with_context, url_for
 from flask_restful import Resource
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.exceptions import BadRequest
-from grpc import RpcError
 
 from issue_api import db
-from issue_api.models import Report
-from issue_api.utils import load_json_schema, require_api_key, require_owner_or_admin, get_doc_path
-from ..rpc_client import update_rankings
+from issue_api.models import (
+    Report,
+    ReportType,
+    Comment,
+    VERSIONED_TABLES,
+    bump_table_versions,
+    get_table_versions,
+)
+from issue_api.utils import (
+    get_schema_validator,
+    SchemaValidator,
+    require_api_key,
+    require_owner_or_admin,
+    get_doc_path,
+    encode_cursor,
+    decode_cursor,
+    dump_json,
+    make_etag,
+    not_modified,
+)
+from issue_api.timing import timed
+from ..ranking_worker import schedule_ranking_update
+
+VALIDATOR = get_schema_validator("report.json")
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 500
+BATCH_VALIDATOR = SchemaValidator({
+    "type": "array",
+    "minItems": 1,
+    "maxItems": MAX_BATCH_SIZE,
+})
+SORT_ORDERS = ("newest", "urgency")
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _parse_limit(value):
+    """Returns the page size requested with the limit query parameter."""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError as err:
+        raise BadRequest(description="limit must be an integer") from err
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
 
-SCHEMA = load_json_schema("report.json")
+def _sort_key(report: Report, sort: str):
+    """Returns the value of the sort column used as the keyset of a report."""
+    if sort == "urgency":
+        return report.urgency_score
+    return report.timestamp
+
+
+def _parse_since(value):
+    """Returns the since query parameter as a naive UTC datetime."""
+    try:
+        since = datetime.fromisoformat(value)
+    except ValueError as err:
+        raise BadRequest(description="since must be an ISO 8601 timestamp") from err
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _gzip_chunks(chunks):
+    """Compresses a stream of byte chunks into a gzip stream."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
 
 class ReportCollection(Resource):
@@ -20,59 +94,243 @@ class ReportCollection(Resource):
 
     @swag_from(get_doc_path("reportcollection/get.yml"))
     def get(self):
-        """Get all reports."""
+        """Get all reports, newest first or most urgent first.
+
+        Passing limit and/or cursor returns a single page keyed on
+        (timestamp, id), or on (urgency_score, id) with sort=urgency. Both
+        orders are read from an index, so a page of K reports is found
+        without sorting the whole table. The cursor for the following page
+        is returned in the Next-Cursor header together with a Link header
+        (rel="next").
+        """
         user_id = request.args.get("user_id")
+        limit = request.args.get("limit")
+        cursor = request.args.get("cursor")
+        sort = request.args.get("sort", "newest")
+        if sort not in SORT_ORDERS:
+            raise BadRequest(description=f"sort must be one of {', '.join(SORT_ORDERS)}")
+        # Invalid arguments are rejected even if the reports did not change
+        paged = limit is not None or cursor is not None
+        limit = _parse_limit(limit)
+        position = None
+        if cursor:
+            position = decode_cursor(
+                cursor, float if sort == "urgency" else datetime.fromisoformat
+            )
 
-        response_data = []
+        etag = make_etag("reports", *get_table_versions(VERSIONED_TABLES))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        query = Report.query.options(joinedload(Report.report_type), joinedload(Report.user))
         if user_id:
-            reports = Report.query.filter_by(user_id=user_id).all()
+            query = query.filter_by(user_id=user_id)
+        if sort == "urgency":
+            # Reports that have not been ranked yet are left out of the feed
+            key_column = Report.urgency_score
+            query = query.filter(key_column.is_not(None))
         else:
-            reports = Report.query.all()
-        for report in reports:
-            response_data.append(report.serialize(short_form=True))
-        return response_data
+            key_column = Report.timestamp
+        query = query.order_by(key_column.desc(), Report.id.desc())
+
+        if not paged:
+            reports = query.all()
+            with timed("serialize"):
+                body = [report.serialize(short_form=True) for report in reports]
+            return body, 200, {"ETag": etag}
+
+        if position is not None:
+            key, report_id = position
+            # Row value comparison lets SQLite seek the (key, id) index
+            query = query.filter(tuple_(key_column, Report.id) < tuple_(key, report_id))
+
+        # Fetch one extra row to find out whether another page exists
+        reports = query.limit(limit + 1).all()
+        headers = {"ETag": etag}
+        if len(reports) > limit:
+            reports = reports[:limit]
+            next_cursor = encode_cursor(_sort_key(reports[-1], sort), reports[-1].id)
+            args = request.args.to_dict()
+            args.update(limit=limit, cursor=next_cursor)
+            headers["Next-Cursor"] = next_cursor
+            headers["Link"] = f'<{url_for("api.reportcollection", **args)}>; rel="next"'
+
+        with timed("serialize"):
+            body = [report.serialize(short_form=True) for report in reports]
+        return body, 200, headers
 
     @swag_from(get_doc_path("reportcollection/post.yml"))
     @require_api_key
     def post(self, auth_user):
         """Create a new report."""
         try:
-            validate(request.json, SCHEMA)
+            VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
         report = Report()
         report.deserialize(json_dict=request.json)
 
-        report.user = auth_user
+        report.user_id = auth_user.id
         db.session.add(report)
         db.session.commit()
 
-        try:
-            update_rankings()
-        except RpcError:
-            # RPC server unavailable
-            pass
+        schedule_ranking_update()
 
         return Response(status=201, headers={
             "location": url_for("api.reportitem", report=report)
         })
 
 
+class ReportBatch(Resource):
+    """Resource for creating many reports at once."""
+
+    @swag_from(get_doc_path("reportbatch/post.yml"))
+    @require_api_key
+    def post(self, auth_user):
+        """Create a batch of reports.
+
+        Every report is validated on its own and the valid ones are inserted
+        with a single bulk INSERT in one transaction, followed by at most one
+        ranking update. The response lists the status of each report in
+        request order: 201 with its location, or 400 with an error message.
+        """
+        try:
+            BATCH_VALIDATOR.validate(request.json)
+        except ValidationError as err:
+            raise BadRequest(description=str(err)) from err
+
+        results = [None] * len(request.json)
+        valid = []
+        for index, item in enumerate(request.json):
+            try:
+                VALIDATOR.validate(item)
+            except ValidationError as err:
+                results[index] = {"status": 400, "message": err.message}
+            else:
+                valid.append((index, item))
+
+        # Check all referenced report types with a single query
+        type_ids = {item.get("report_type_id") for _index, item in valid} - {None}
+        known_ids = set(db.session.scalars(
+            db.select(ReportType.id).where(ReportType.id.in_(type_ids))
+        ))
+        rows = []
+        for index, item in valid:
+            type_id = item.get("report_type_id")
+            if type_id is not None and type_id not in known_ids:
+                results[index] = {"status": 400,
+                                  "message": f"ReportType with id '{type_id}' not found"}
+                continue
+            rows.append((index, {
+                "user_id": auth_user.id,
+                "report_type_id": type_id,
+                "description": item["description"],
+                "location": item["location"],
+            }))
+
+        if rows:
+            # SQLite does not promise to return rows in parameter order, and
+            # asking SQLAlchemy for it falls back to one INSERT per row. New
+            # rowids are assigned in ascending order, so sort by id instead.
+            reports = sorted(db.session.scalars(
+                insert(Report).returning(Report),
+                [row for _index, row in rows],
+            ), key=lambda report: report.id)
+            bump_table_versions(db.session.connection(), ["report"])
+            db.session.commit()
+            for (index, _row), report in zip(rows, reports):
+                results[index] = {
+                    "status": 201,
+                    "location": url_for("api.reportitem", report=report),
+                }
+            schedule_ranking_update()
+
+        if len(rows) == len(results):
+            status = 201
+        elif rows:
+            status = 207
+        else:
+            status = 400
+        return results, status
+
+
+class ReportExport(Resource):
+    """Resource for exporting reports as newline delimited JSON."""
+
+    @swag_from(get_doc_path("reportexport/get.yml"))
+    def get(self):
+        """Stream reports oldest first, one JSON document per line.
+
+        Rows are read EXPORT_CHUNK_SIZE at a time with yield_per and each
+        chunk is written out before the next one is loaded, so memory use
+        does not grow with the number of reports. The stream is compressed
+        on the fly for clients that accept gzip.
+        """
+        query = (
+            db.select(Report)
+            .options(joinedload(Report.report_type), joinedload(Report.user))
+            .order_by(Report.timestamp, Report.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        since = request.args.get("since")
+        if since:
+            query = query.where(Report.timestamp >= _parse_since(since))
+        report_type = request.args.get("report_type")
+        if report_type:
+            try:
+                query = query.where(Report.report_type_id == int(report_type))
+            except ValueError as err:
+                raise BadRequest(description="report_type must be an integer") from err
+
+        def generate():
+            for reports in db.session.scalars(query).partitions():
+                yield b"".join(
+                    dump_json(report.serialize(short_form=True)) + b"\n" for report in reports
+                )
+
+        chunks = generate()
+        headers = {"Vary": "Accept-Encoding", "X-Accel-Buffering": "no"}
+        if request.accept_encodings.quality("gzip") > 0:
+            chunks = _gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return Response(stream_with_context(chunks), mimetype="application/x-ndjson",
+                        headers=headers)
+
+
 class ReportItem(Resource):
     """Resource for handling report items."""
 
     @swag_from(get_doc_path("reportitem/get.yml"))
     def get(self, report: Report):
         """Get a specific report."""
-        return report.serialize(short_form=False)
+        etag = make_etag("report", report.id, report.version,
+                         *get_table_versions(("report_type", "user")))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        report = db.session.scalars(
+            db.select(Report)
+            .where(Report.id == report.id)
+            .options(
+                joinedload(Report.report_type),
+                joinedload(Report.user),
+                selectinload(Report.comments).joinedload(Comment.user),
+            )
+            .execution_options(populate_existing=True)
+        ).one()
+        with timed("serialize"):
+            body = report.serialize(short_form=False)
+        return body, 200, {"ETag": etag}
 
     @swag_from(get_doc_path("reportitem/put.yml"))
     @require_owner_or_admin("report", "user_id")
     def put(self, report: Report, **_kwargs):
         """Update a specific report."""
         try:
-            validate(request.json, SCHEMA)
+            VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
@@ -3,16 +3,22 @@
 from flasgger import swag_from
 from flask import Response, request, url_for
 from flask_restful import Resource
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import BadRequest, Conflict
 
 from issue_api import db
-from issue_api.models import ReportType
-from issue_api.utils import load_json_schema, require_admin, get_doc_path
+from issue_api.models import ReportType, get_table_versions
+from issue_api.utils import (
+    get_schema_validator,
+    require_admin,
+    get_doc_path,
+    make_etag,
+    not_modified,
+)
 
 
-REPORT_TYPE_SCHEMA = load_json_schema("report_type.json")
+REPORT_TYPE_VALIDATOR = get_schema_validator("report_type.json")
 
 # pylint: disable=line-too-long
 # Adapted from course material: https://github.com/UniOulu-Ubicomp-Programming-Courses/pwp-sensorhub-example/blob/ex2-project-layout/sensorhub/resources/sensor.py
@@ -22,18 +28,23 @@ class ReportTypeCollection(Resource):
     @swag_from(get_doc_path("reporttypecollection/get.yml"))
     def get(self):
         """Get all report types."""
+        etag = make_etag("report_types", *get_table_versions(("report_type",)))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         response_data = []
         report_types = ReportType.query.all()
         for report_type in report_types:
             response_data.append(report_type.serialize())
-        return response_data
+        return response_data, 200, {"ETag": etag}
 
     @swag_from(get_doc_path("reporttypecollection/post.yml"))
     @require_admin
     def post(self, **_kwargs):
         """Create a new report type."""
         try:
-            validate(request.json, REPORT_TYPE_SCHEMA)
+            REPORT_TYPE_VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
@@ -61,7 +72,7 @@ class ReportTypeItem(Resource):
     def put(self, report_type: ReportType, **_kwargs):
         """Update a report type."""
         try:
-            validate(request.json, REPORT_TYPE_SCHEMA)
+            REPORT_TYPE_VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
@@ -8,6 +8,7 @@ from werkzeug.exceptions import NotFound, Conflict
 from issue_api import db
 from issue_api.models import Report, User
 from issue_api.utils import validate_user, get_doc_path
+from ..ranking_worker import schedule_ranking_update
 
 
 class ReportUpvote(Resource):
@@ -29,7 +30,10 @@ class ReportUpvote(Resource):
             raise Conflict("You have already upvoted this report")
 
         user.reports_upvoted.append(report)
+        report.upvote_count = Report.upvote_count + 1
+        report.ranking_dirty = True
         db.session.commit()
+        schedule_ranking_update()
 
         return Response(status=201)
 
@@ -42,6 +46,9 @@ class ReportUpvote(Resource):
             raise NotFound("You have not upvoted this report")
 
         user.reports_upvoted.remove(report)
+        report.upvote_count = Report.upvote_count - 1
+        report.ranking_dirty = True
         db.session.commit()
+        schedule_ranking_update()
 
         return Response(status=204)
@@ -1,18 +1,23 @@
 """Resources for users in the issue API."""
 
 from flasgger import swag_from
-from flask import Response, request, url_for
+from flask import Response, current_app, request, url_for
 from flask_restful import Resource
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import BadRequest, Conflict
 
 from issue_api import db
-from issue_api.models import User, ApiKey
-from issue_api.utils import load_json_schema, require_admin, require_owner_or_admin, get_doc_path
+from issue_api.models import User, ApiKey, Report, upvotes, bump_table_versions
+from issue_api.utils import (
+    get_schema_validator,
+    require_admin,
+    require_owner_or_admin,
+    get_doc_path,
+)
 
 
-SCHEMA = load_json_schema("user.json")
+VALIDATOR = get_schema_validator("user.json")
 
 
 class UserCollection(Resource):
@@ -32,7 +37,7 @@ class UserCollection(Resource):
     def post(self):
         """Create a new user."""
         try:
-            validate(request.json, SCHEMA)
+            VALIDATOR.validate(request.json)
         except ValidationError as err:
             raise BadRequest(description=str(err)) from err
 
@@ -71,6 +76,16 @@ class UserItem(Resource):
     @require_owner_or_admin("user", "id")
     def delete(self, user: User, **_kwargs):
         """Delete a specific user."""
+        upvoted_report_ids = db.select(upvotes.c.report_id).where(upvotes.c.user_id == user.id)
+        db.session.execute(
+            db.update(Report)
+            .where(Report.id.in_(upvoted_report_ids))
+            .values(upvote_count=Report.upvote_count - 1, ranking_dirty=True,
+                    version=Report.version + 1)
+        )
+        bump_table_versions(db.session.connection(), ["report"])
+        user_id = user.id
         db.session.delete(user)
         db.session.commit()
+        current_app.extensions["auth_cache"].invalidate_user(user_id)
         return Response(status=204)
@@ -1,41 +1,222 @@
 """RPC client for remote procedure calls to the ranking service."""
 
+import atexit
+import logging
 import os
 import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
 import grpc
+from flask import current_app
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # pylint: disable=wrong-import-position
 import protos.ranking_pb2 as pb2
 import protos.ranking_pb2_grpc as pb2_grpc
 
-from issue_api.models import Report
+from issue_api.models import Report, RankingState, bump_table_versions
 from issue_api import db
 
-def update_rankings():
+logger = logging.getLogger(__name__)
+
+UPDATE_CHUNK_SIZE = 5000
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.initial_reconnect_backoff_ms", 1000),
+    ("grpc.max_reconnect_backoff_ms", 10000),
+]
+
+
+class ChannelManager:
+    """Keeps one gRPC channel to the ranking service open per process.
+
+    The channel is opened lazily so that every gunicorn worker opens its own
+    after forking. gRPC reconnects the channel by itself when the service
+    restarts, and keepalive pings detect dead connections.
+    """
+
+    def __init__(self):
+        self._channel = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_channel(self):
+        """Returns the channel of this process, opening it if needed."""
+        with self._lock:
+            if self._channel is None or self._pid != os.getpid():
+                ranking_host = os.environ.get('RANKING_SERVICE_HOST', 'localhost')
+                self._channel = grpc.insecure_channel(f'{ranking_host}:50051',
+                                                      options=CHANNEL_OPTIONS)
+                self._pid = os.getpid()
+            return self._channel
+
+    def close(self):
+        """Closes the channel if this process opened one."""
+        with self._lock:
+            if self._channel is not None and self._pid == os.getpid():
+                self._channel.close()
+            self._channel = None
+            self._pid = None
+
+
+channel_manager = ChannelManager()
+atexit.register(channel_manager.close)
+
+def get_ranking_stub():
+    """Returns a ranking service stub using the shared channel."""
+    return pb2_grpc.RankingServiceStub(channel_manager.get_channel())
+
+def _full_sweep_due(state, now):
+    """Returns whether every report should be re-ranked to apply time decay."""
+    if state.full_sweep_at is None:
+        return True
+    interval = timedelta(seconds=current_app.config["RANKING_FULL_SWEEP_INTERVAL"])
+    return now - state.full_sweep_at.replace(tzinfo=timezone.utc) >= interval
+
+def _ranking_requests(app, full, chunk_size, versions=None):
+    """Yields the reports to rank as RankingRequest chunks of packed columns.
+
+    gRPC consumes this generator in its own thread, so every chunk is read
+    with a short-lived session of its own, paging through reports by id.
+    The row version of every report read is stored in versions, if given.
+    """
+    last_id = 0
+    while True:
+        with app.app_context():
+            query = (
+                db.select(Report.id, Report.timestamp, Report.upvote_count,
+                          Report.comment_count, Report.version)
+                .where(Report.id > last_id)
+                .order_by(Report.id)
+                .limit(chunk_size)
+            )
+            if not full:
+                query = query.where(Report.ranking_dirty)
+            rows = db.session.execute(query).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        if versions is not None:
+            versions.update((row.id, row.version) for row in rows)
+        yield pb2.RankingRequest(
+            report_ids=[row.id for row in rows],
+            timestamps=[str(row.timestamp) for row in rows],
+            upvote_counts=[row.upvote_count for row in rows],
+            comment_counts=[row.comment_count for row in rows],
+        )
+
+def _calculate_rankings(stub, make_requests):
+    """Yields ranking responses, streaming the requests when the service supports it."""
+    try:
+        yield from stub.StreamRanking(make_requests())
+    except grpc.RpcError as err:
+        if err.code() != grpc.StatusCode.UNIMPLEMENTED:  # pylint: disable=no-member
+            raise
+        # Ranking service predating StreamRanking, and so the packed columns
+        columns = pb2.RankingRequest()
+        for request in make_requests():
+            columns.MergeFrom(request)
+        yield stub.CalculateRanking(pb2.RankingRequest(reports=[
+            pb2.Report(id=report_id, timestamp=timestamp,
+                       upvote_count=upvote_count, comment_count=comment_count)
+            for report_id, timestamp, upvote_count, comment_count in zip(
+                columns.report_ids, columns.timestamps,
+                columns.upvote_counts, columns.comment_counts,
+            )
+        ]))
+
+def _response_rankings(response):
+    """Returns the (report id, score) pairs of a ranking response of either form."""
+    if response.rankings:
+        return [(entry.report_id, entry.score) for entry in response.rankings]
+    return list(zip(response.report_ids, response.scores))
+
+def _apply_rankings(rankings, versions):
+    """Stores (report id, score) pairs of one batch of rankings and clears the dirty flags.
+
+    Every UPDATE_CHUNK_SIZE scores are written with one executemany UPDATE
+    in a transaction of their own, so the SQLite write lock is held briefly.
+    The statement goes straight to the driver because SQLAlchemy's per-row
+    parameter processing costs more than the UPDATE itself.
+    Only reports still at the row version they were read with are updated,
+    so reports changed while the RPC was running stay dirty and are ranked
+    again by the update their change scheduled.
+    """
+    statement = (
+        f"UPDATE {Report.__tablename__} "
+        "SET urgency_score = ?, ranking_dirty = 0, version = version + 1 "
+        "WHERE id = ? AND version = ?"
+    )
+    params = [(score, report_id, versions.get(report_id)) for report_id, score in rankings]
+    for start in range(0, len(params), UPDATE_CHUNK_SIZE):
+        connection = db.session.connection()
+        connection.exec_driver_sql(statement, params[start:start + UPDATE_CHUNK_SIZE])
+        bump_table_versions(connection, ["report"])
+        db.session.commit()
+
+def update_rankings(full=None):
     """Remotely calls a function on an RPC server to calculate 
-    urgency score and updates the scores in the database"""
-    ranking_host = os.environ.get('RANKING_SERVICE_HOST', 'localhost')
-    channel = grpc.insecure_channel(f'{ranking_host}:50051')
-    stub = pb2_grpc.RankingServiceStub(channel)
-
-    reports = Report.query.all()
-    reports_serialized = []
-    for report in reports:
-        serialized = report.serialize()
-        serialized_cut = {
-            "id": serialized["id"],
-            "timestamp": serialized["timestamp"],
-            "upvote_count": serialized["upvote_count"],
-            "comment_count": serialized["comment_count"],
-        }
-        reports_serialized.append(serialized_cut)
-
-    response = stub.CalculateRanking((pb2.RankingRequest(reports=reports_serialized)))
-
-    for entry in response.rankings:
-        report = Report.query.get(entry.report_id)
-        if report:
-            report.urgency_score = entry.score
+    urgency score and updates the scores in the database
+
+    Only reports marked dirty since the previous update are ranked, unless
+    a full sweep is requested or RANKING_FULL_SWEEP_INTERVAL has passed
+    since the last one. Reports are streamed to the service in chunks of
+    RANKING_CHUNK_SIZE and the scores are stored one chunk at a time.
+    Chunks the service answers with success=false stay dirty, and the
+    update is then not recorded as a refresh.
+    """
+    now = datetime.now(timezone.utc)
+    state = RankingState.get()
+    if full is None:
+        full = _full_sweep_due(state, now)
+
+    if not full:
+        dirty = db.session.execute(
+            db.select(Report.id).where(Report.ranking_dirty).limit(1)
+        ).first()
+        if dirty is None:
+            db.session.rollback()
+            return
+    # Do not keep a transaction open while the RPC runs
+    db.session.rollback()
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    chunk_size = current_app.config["RANKING_CHUNK_SIZE"]
+    metrics = current_app.extensions["metrics"]
+    stub = get_ranking_stub()
+    versions = {}
+    responses = _calculate_rankings(
+        stub, lambda: _ranking_requests(app, full, chunk_size, versions)
+    )
+    waited = 0.0
+    failed = False
+    while True:
+        start = time.perf_counter()
+        try:
+            response = next(responses, None)
+        except grpc.RpcError as err:
+            metrics.ranking_rpc_failures.inc(code=err.code().name)  # pylint: disable=no-member
+            raise
+        waited += time.perf_counter() - start
+        if response is None:
+            break
+        if not response.success:
+            metrics.ranking_rpc_failures.inc(code="UNSUCCESSFUL")
+            logger.warning("Ranking service failed to rank reports: %s", response.message)
+            failed = True
+            continue
+        _apply_rankings(_response_rankings(response), versions)
+    metrics.ranking_rpc_duration.observe(waited)
+    if failed:
+        return
 
+    state = RankingState.get()
+    state.refreshed_at = now
+    if full:
+        state.full_sweep_at = now
     db.session.commit()
@@ -0,0 +1,134 @@
+"""Opt-in per-request timing of SQL, validation, serialization and ranking.
+
+With REQUEST_TIMING enabled, every response gets a Server-Timing header and
+a structured log line with the number of SQL statements, the time spent in
+them and in the parts timed with timed(). Requests slower than
+SLOW_REQUEST_THRESHOLD seconds are logged as warnings together with their
+SQL statements.
+"""
+
+import json
+import logging
+import time
+from collections import defaultdict
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing descriptions of the parts of a request
+DESCRIPTIONS = {
+    "sql": "SQL",
+    "validate": "Schema validation",
+    "serialize": "Serialization",
+    "ranking": "Ranking update",
+    "total": "Total",
+}
+
+
+class RequestTiming:
+    """Time spent in the parts of one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.statements = []
+
+    def add(self, name, seconds):
+        """Adds time spent in the given part of the request."""
+        self.durations[name] += seconds
+
+    def server_timing(self, total):
+        """Returns the value of the Server-Timing header."""
+        metrics = []
+        for name, seconds in [*self.durations.items(), ("total", total)]:
+            description = DESCRIPTIONS.get(name, name)
+            if name == "sql":
+                description = f"{len(self.statements)} SQL statements"
+            metrics.append(f'{name};dur={seconds * 1000:.2f};desc="{description}"')
+        return ", ".join(metrics)
+
+
+def current_timing():
+    """Returns the RequestTiming of the current request, or None if not timed."""
+    if not has_request_context():
+        return None
+    return g.get("request_timing")
+
+
+class timed:  # pylint: disable=invalid-name
+    """Context manager adding its duration to a part of the current request."""
+
+    __slots__ = ("name", "timing", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.timing = None
+        self.start = 0.0
+
+    def __enter__(self):
+        self.timing = current_timing()
+        if self.timing is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc):
+        if self.timing is not None:
+            self.timing.add(self.name, time.perf_counter() - self.start)
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    # Statements on one connection run one at a time
+    conn.info["query_start_time"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany):
+    timing = current_timing()
+    if timing is not None:
+        seconds = time.perf_counter() - conn.info["query_start_time"]
+        timing.add("sql", seconds)
+        timing.statements.append((statement, seconds))
+
+
+def _start_request():
+    g.request_timing = RequestTiming()
+
+
+def _finish_request(response):
+    timing = g.pop("request_timing", None)
+    if timing is None:
+        return response
+    total = time.perf_counter() - timing.start
+    response.headers["Server-Timing"] = timing.server_timing(total)
+
+    record = {
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 2),
+        "sql_count": len(timing.statements),
+        **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in timing.durations.items()},
+    }
+    threshold = current_app.config["SLOW_REQUEST_THRESHOLD"]
+    if threshold is not None and total >= threshold:
+        record["sql"] = [
+            {"statement": statement, "ms": round(seconds * 1000, 2)}
+            for statement, seconds in timing.statements
+        ]
+        logger.warning("Slow request %s", json.dumps(record))
+    else:
+        logger.info("Request %s", json.dumps(record))
+    return response
+
+
+def init_app(app, engine):
+    """Registers the request hooks and SQL event listeners on the app and its engine
+    if REQUEST_TIMING is enabled, so that requests and queries pay nothing otherwise.
+    """
+    if not app.config["REQUEST_TIMING"]:
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,13 +1,32 @@
 """Utility functions for the issue API."""
 import os
 import json
-from functools import wraps
+import base64
+import binascii
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from functools import lru_cache, wraps
 
-from flask import request
+from flask import Response, current_app, request
+from jsonschema import validators
+from jsonschema.exceptions import best_match
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import quote_etag
 from werkzeug.routing import BaseConverter
-from werkzeug.exceptions import NotFound, Forbidden, Unauthorized
+from werkzeug.exceptions import BadRequest, NotFound, Forbidden, Unauthorized
 
+from issue_api.extensions import db
 from issue_api.models import ReportType, Report, Comment, ApiKey, User
+from issue_api.timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 SCHEMA_FOLDER_PATH = os.path.join(os.path.dirname(__file__), "static/schema/")
@@ -20,45 +39,256 @@ def load_json_schema(file_name: str):
     with open(schema_path, encoding="utf-8") as file:
         return json.load(file)
 
+# Python types accepted for each JSON schema type by the fast path. Checked
+# with type() because bool is a subclass of int.
+FAST_PATH_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+}
+
+def _compile_flat_schema(schema):
+    """Returns the checks for a flat object schema, or None if not flat.
+
+    A schema is flat if it is an object with required keys and properties of
+    simple types, where strings may be limited with minLength and maxLength.
+    """
+    if set(schema) - {"$schema", "title", "description", "type", "required", "properties"}:
+        return None
+    if schema.get("type") != "object":
+        return None
+    checks = []
+    for name, prop in schema.get("properties", {}).items():
+        types = FAST_PATH_TYPES.get(prop.get("type"))
+        if types is None or set(prop) - {"type", "description", "minLength", "maxLength"}:
+            return None
+        if prop["type"] != "string" and ("minLength" in prop or "maxLength" in prop):
+            return None
+        checks.append((name, types, prop.get("minLength", 0), prop.get("maxLength")))
+    return tuple(schema.get("required", ())), tuple(checks)
+
+class SchemaValidator:
+    """Precompiled validator for a JSON schema.
+
+    The schema is checked and its jsonschema validator is created once.
+    Flat schemas are also compiled into plain Python checks: documents that
+    pass them are accepted without generic validation, while anything else
+    goes through jsonschema so that errors stay the same.
+    """
+
+    def __init__(self, schema):
+        validator_class = validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        self.validator = validator_class(schema)
+        self.fast_path = _compile_flat_schema(schema)
+
+    def is_fast_valid(self, instance):
+        """Returns True if the fast path accepts the given document."""
+        if self.fast_path is None or not isinstance(instance, dict):
+            return False
+        required, checks = self.fast_path
+        for name in required:
+            if name not in instance:
+                return False
+        for name, types, min_length, max_length in checks:
+            if name not in instance:
+                continue
+            value = instance[name]
+            if type(value) not in types:
+                return False
+            if max_length is not None and len(value) > max_length:
+                return False
+            if min_length and len(value) < min_length:
+                return False
+        return True
+
+    def validate(self, instance):
+        """Raises ValidationError if the document does not match the schema."""
+        with timed("validate"):
+            if self.is_fast_valid(instance):
+                return
+            error = best_match(self.validator.iter_errors(instance))
+        if error is not None:
+            raise error
+
+@lru_cache(maxsize=None)
+def get_schema_validator(file_name: str):
+    """Returns the cached SchemaValidator for the JSON schema with the given file name."""
+    return SchemaValidator(load_json_schema(file_name))
+
+def _json_default(obj):
+    """Encodes the types the standard library json module does not support."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dump_json(data) -> bytes:
+    """Encodes data as compact UTF-8 JSON.
+
+    Uses orjson when it is installed and the standard library otherwise.
+    Dates and datetimes are written in ISO 8601 format by both.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"),
+                      default=_json_default).encode()
+
 def get_doc_path(path_in_doc_dir: str):
     """Returns the path to a document file in the doc directory."""
     doc_dir = os.path.join(os.path.dirname(__file__), "doc")
     return os.path.join(doc_dir, path_in_doc_dir)
 
+def encode_cursor(key, item_id: int):
+    """Returns an opaque pagination cursor for the given (key, id) pair.
+
+    The key is the sort column value of the last item on a page, either a
+    timestamp or a number.
+    """
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([key, item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key_type=datetime.fromisoformat):
+    """Returns the (key, id) pair stored in a pagination cursor.
+
+    The key is converted with key_type, which defaults to parsing a timestamp.
+    Booleans and non-finite numbers are rejected as keys.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(item_id, int) or isinstance(item_id, bool) or isinstance(key, bool):
+            raise ValueError(item_id)
+        key = key_type(key)
+        if isinstance(key, float) and not math.isfinite(key):
+            raise ValueError(key)
+        return key, item_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as err:
+        raise BadRequest(description="Invalid pagination cursor") from err
+
+AuthenticatedUser = namedtuple("AuthenticatedUser", ["id", "admin"])
+
+# Writes with a key of a user deleted through another worker must not get through
+
+class AuthCache:
+    """Bounded LRU cache of authenticated API keys with a time to live.
+
+    Maps API key hashes to the AuthenticatedUser of the key. Each process has
+    its own cache, so a user deleted through another gunicorn worker can keep
+    authenticating here until the entry expires.
+    """
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key_hash):
+        """Returns the cached user for a key hash, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            auth_user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key_hash]
+                return None
+            self._entries.move_to_end(key_hash)
+            return auth_user
+
+    def set(self, key_hash, auth_user):
+        """Stores the user of a key hash, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key_hash] = (auth_user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key_hash):
+        """Removes the cached user of a key hash, if any."""
+        with self._lock:
+            self._entries.pop(key_hash, None)
+
+    def invalidate_user(self, user_id):
+        """Removes all cached keys of the given user."""
+        with self._lock:
+            for key_hash in [key_hash for key_hash, (auth_user, _) in self._entries.items()
+                             if auth_user.id == user_id]:
+                del self._entries[key_hash]
+
+def make_etag(*versions):
+    """Returns a quoted strong ETag for a resource built from the given versions."""
+    return quote_etag(hashlib.sha256(repr(versions).encode()).hexdigest()[:32])
+
+def not_modified(etag: str):
+    """Returns a 304 response if the request's If-None-Match matches the ETag, otherwise None.
+
+    If-None-Match uses the weak comparison, so W/ tags added by proxies match too.
+    """
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers={"ETag": etag})
+    return None
+
 def _authenticate():
-    """Returns the API key object for the key in request headers."""
+    """Returns the authenticated user for the API key in request headers."""
     key = request.headers.get(API_KEY_HEADER, "").strip()
     if not key:
         raise Unauthorized("Missing API key")
     key_hash = ApiKey.key_hash(key)
-    db_api_key = ApiKey.query.filter_by(key=key_hash).first()
-    if db_api_key is None:
-        raise Unauthorized("Invalid API key")
-    return db_api_key
+    auth_cache = current_app.extensions["auth_cache"]
+    auth_user = auth_cache.get(key_hash)
+    current_app.extensions["metrics"].auth_cache.inc(
+        result="miss" if auth_user is None else "hit"
+    )
+    if auth_user is None:
+        db_api_key = ApiKey.query.filter_by(key=key_hash).first()
+        if db_api_key is None:
+            auth_cache.discard(key_hash)
+            raise Unauthorized("Invalid API key")
+        auth_user = AuthenticatedUser(db_api_key.user_id, bool(db_api_key.admin))
+        auth_cache.set(key_hash, auth_user)
+    return auth_user
+
+def _call_authenticated(func, auth_user, *args, **kwargs):
+    # A user deleted through another worker can stay in the auth cache of
+    # this one until the entry expires, and then writes fail on a foreign key
+    try:
+        return func(*args, auth_user=auth_user, **kwargs)
+    except IntegrityError:
+        db.session.rollback()
+        if db.session.get(User, auth_user.id) is not None:
+            raise
+        current_app.extensions["auth_cache"].invalidate_user(auth_user.id)
+        raise Unauthorized("Invalid API key") from None
 
 def validate_user(user: User):
     """Attempts to authenticate user with the API key in request headers
     and checks if the corresponds to the user specified in URL."""
-    api_key = _authenticate()
-    if api_key.user != user:
+    auth_user = _authenticate()
+    if auth_user.id != user.id:
         raise Forbidden("API key and user ID do not match")
 
 def require_admin(func):
     """Wrapper function for requiring admin privileges for HTTP requests."""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        db_api_key = _authenticate()
-        if not db_api_key.admin:
+        auth_user = _authenticate()
+        if not auth_user.admin:
             raise Forbidden("Only an admin can perform this action")
-        return func(*args, auth_user=db_api_key.user, **kwargs)
+        return _call_authenticated(func, auth_user, *args, **kwargs)
     return wrapper
 
 def require_api_key(func):
     """Wrapper function for requiring authentication for HTTP requests."""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        db_api_key = _authenticate()
-        return func(*args, auth_user=db_api_key.user, **kwargs)
+        auth_user = _authenticate()
+        return _call_authenticated(func, auth_user, *args, **kwargs)
     return wrapper
 
 def require_owner_or_admin(resource_name, owner_field="user_id"):
@@ -67,11 +297,11 @@ def require_owner_or_admin(resource_name, owner_field="user_id"):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            db_api_key = _authenticate()
+            auth_user = _authenticate()
             resource = kwargs[resource_name]
-            if not db_api_key.admin and getattr(resource, owner_field) != db_api_key.user.id:
+            if not auth_user.admin and getattr(resource, owner_field) != auth_user.id:
                 raise Forbidden("Only an admin or the resource owner can perform this action")
-            return func(*args, auth_user=db_api_key.user, **kwargs)
+            return _call_authenticated(func, auth_user, *args, **kwargs)
         return wrapper
     return decorator
 
@@ -4,7 +4,7 @@ import { useUser } from '../stores/userStore'
 import ReportListItem from './ReportListItem'
 
 /**
- * Component that displays a list of reports.
+ * Component that displays a list of reports, one page at a time.
  * Allows filtering (e.g., all vs my reports) and sorting (by newest or urgency).
  *
  * @returns {JSX.Element} The rendered reports list view.
@@ -14,20 +14,8 @@ const ReportsView = () => {
   const [sortBy, setSortBy] = useState('newest')
   const user = useUser()
   const userId = filter === 'my' && user ? user.id : null
-  const { reports, isPending } = useReports(userId)
-
-  const sortedReports = Array.isArray(reports)
-  ? [...reports].sort((a, b) => {
-      switch (sortBy) {
-        case 'newest':
-          return new Date(b.timestamp).getTime() - new Date(a.timestamp).getTime()
-        case 'urgency':
-          return b.urgency_score - a.urgency_score
-        default:
-          return 0
-      }
-    })
-  : []
+  // The API returns the pages in the chosen order
+  const { reports, isPending, hasMore, isLoadingMore, loadMore } = useReports(userId, sortBy)
 
   if (isPending) {
     return (
@@ -89,10 +77,23 @@ const ReportsView = () => {
 
       {/* Report list */}
       <div className="space-y-4">
-        {sortedReports.map((report) => (
+        {reports.map((report) => (
           <ReportListItem key={report.id} report={report} />
         ))}
       </div>
+
+      {hasMore && (
+        <div className="flex justify-center mt-6">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="text-sm font-medium border border-gray-300 rounded-lg px-4 py-2 bg-white text-gray-700 hover:border-primary-400 disabled:opacity-50 transition-colors"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -1,23 +1,28 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import {
-    getAllReports,
+    getReportsPage,
     createNewReport,
 } from '../services/reports'
 
 /**
  * Custom hook to manage fetching and creating reports.
+ * Reports are fetched one page at a time, in the order given by `sort`.
  *
  * @param {string} [userId=null] - Optional user ID to filter the fetched reports.
- * @returns {Object} An object containing the reports array, loading state, and the `addReport` mutation function.
+ * @param {string} [sort='newest'] - Order of the reports, 'newest' or 'urgency'.
+ * @returns {Object} An object containing the reports array of the fetched pages, loading state,
+ *                   paging state with the `loadMore` function, and the `addReport` mutation function.
  * @throws {Error} Propagates API errors to the `onError` callbacks of the returned mutation function.
  *                 Component level error handling is required when calling `addReport`.
  */
-export const useReports = (userId = null) => {
+export const useReports = (userId = null, sort = 'newest') => {
     const queryClient = useQueryClient()
 
-    const result = useQuery({
-        queryKey: userId ? ['reports', userId] : ['reports'],
-        queryFn: () => getAllReports(userId),
+    const result = useInfiniteQuery({
+        queryKey: userId ? ['reports', userId, sort] : ['reports', sort],
+        queryFn: ({ pageParam }) => getReportsPage({ userId, sort, cursor: pageParam }),
+        initialPageParam: null,
+        getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
         refetchOnWindowFocus: false,
     })
 
@@ -29,8 +34,11 @@ export const useReports = (userId = null) => {
     })
 
     return {
-        reports: result.data,
+        reports: result.data?.pages.flatMap((page) => page.reports),
         isPending: result.isPending,
+        hasMore: result.hasNextPage,
+        isLoadingMore: result.isFetchingNextPage,
+        loadMore: () => result.fetchNextPage(),
         addReport: (reportData, options) => newReportMutation.mutate(reportData, options),
     }
 }
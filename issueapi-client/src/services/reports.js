@@ -4,25 +4,39 @@ const baseUrl = '/api'
 
 // Reports
 
+export const REPORTS_PAGE_SIZE = 25
+
 /**
- * Fetches all reports from the API, optionally filtered by a specific user ID.
+ * Fetches one page of reports from the API, optionally filtered by a specific user ID.
  *
- * @param {string} [userId] - Optional ID of the user to filter reports by.
- * @returns {Promise<Array<Object>>} A promise that resolves to an array of report objects.
- * @throws {Error} Throws an error if the fetch fails or server returns an error. 
+ * @param {Object} params - The page to fetch.
+ * @param {string} [params.userId] - Optional ID of the user to filter reports by.
+ * @param {string} [params.sort='newest'] - Order of the reports, 'newest' or 'urgency'.
+ * @param {string} [params.cursor] - Cursor of the page, as returned with the previous page.
+ * @returns {Promise<Object>} A promise that resolves to an object with the `reports` of the page
+ *                            and the `nextCursor` of the following page, or null on the last page.
+ * @throws {Error} Throws an error if the fetch fails or server returns an error.
  *                 Handled by displaying a notification or error state in the UI.
  */
-export const getAllReports = async (userId) => {
-    const url = userId
-        ? `${baseUrl}/reports/?user_id=${userId}`
-        : `${baseUrl}/reports/`
-    const response = await fetch(url)
+export const getReportsPage = async ({ userId, sort = 'newest', cursor } = {}) => {
+    const params = new URLSearchParams({ limit: REPORTS_PAGE_SIZE, sort })
+    if (userId) {
+        params.set('user_id', userId)
+    }
+    if (cursor) {
+        params.set('cursor', cursor)
+    }
+    const response = await fetch(`${baseUrl}/reports/?${params}`)
 
     await handleApiError(response, 'Failed to load reports', {
+        400: 'Invalid report list request. Please reload the page.',
         500: 'Server error while loading reports. Please try again later.',
     })
 
-    return await response.json()
+    return {
+        reports: await response.json(),
+        nextCursor: response.headers.get('Next-Cursor'),
+    }
 }
 
 /**
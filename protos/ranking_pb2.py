@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rranking.proto\x12\x07ranking\"T\n\x06Report\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x11\n\ttimestamp\x18\x02 \x01(\t\x12\x14\n\x0cupvote_count\x18\x03 \x01(\x03\x12\x15\n\rcomment_count\x18\x04 \x01(\x03\"2\n\x0eRankingRequest\x12 \n\x07reports\x18\x01 \x03(\x0b\x32\x0f.ranking.Report\"+\n\x07Ranking\x12\x11\n\treport_id\x18\x01 \x01(\x03\x12\r\n\x05score\x18\x02 \x01(\x02\"W\n\x0fRankingResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\"\n\x08rankings\x18\x03 \x03(\x0b\x32\x10.ranking.Ranking2W\n\x0eRankingService\x12\x45\n\x10\x43\x61lculateRanking\x12\x17.ranking.RankingRequest\x1a\x18.ranking.RankingResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rranking.proto\x12\x07ranking\"T\n\x06Report\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x11\n\ttimestamp\x18\x02 \x01(\t\x12\x14\n\x0cupvote_count\x18\x03 \x01(\x03\x12\x15\n\rcomment_count\x18\x04 \x01(\x03\"\x89\x01\n\x0eRankingRequest\x12 \n\x07reports\x18\x01 \x03(\x0b\x32\x0f.ranking.Report\x12\x12\n\nreport_ids\x18\x02 \x03(\x03\x12\x12\n\ntimestamps\x18\x03 \x03(\t\x12\x15\n\rupvote_counts\x18\x04 \x03(\x03\x12\x16\n\x0e\x63omment_counts\x18\x05 \x03(\x03\"+\n\x07Ranking\x12\x11\n\treport_id\x18\x01 \x01(\x03\x12\r\n\x05score\x18\x02 \x01(\x02\"{\n\x0fRankingResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\"\n\x08rankings\x18\x03 \x03(\x0b\x32\x10.ranking.Ranking\x12\x12\n\nreport_ids\x18\x04 \x03(\x03\x12\x0e\n\x06scores\x18\x05 \x03(\x02\x32\x9f\x01\n\x0eRankingService\x12\x45\n\x10\x43\x61lculateRanking\x12\x17.ranking.RankingRequest\x1a\x18.ranking.RankingResponse\x12\x46\n\rStreamRanking\x12\x17.ranking.RankingRequest\x1a\x18.ranking.RankingResponse(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,12 +33,12 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_REPORT']._serialized_start=26
   _globals['_REPORT']._serialized_end=110
-  _globals['_RANKINGREQUEST']._serialized_start=112
-  _globals['_RANKINGREQUEST']._serialized_end=162
-  _globals['_RANKING']._serialized_start=164
-  _globals['_RANKING']._serialized_end=207
-  _globals['_RANKINGRESPONSE']._serialized_start=209
-  _globals['_RANKINGRESPONSE']._serialized_end=296
-  _globals['_RANKINGSERVICE']._serialized_start=298
-  _globals['_RANKINGSERVICE']._serialized_end=385
+  _globals['_RANKINGREQUEST']._serialized_start=113
+  _globals['_RANKINGREQUEST']._serialized_end=250
+  _globals['_RANKING']._serialized_start=252
+  _globals['_RANKING']._serialized_end=295
+  _globals['_RANKINGRESPONSE']._serialized_start=297
+  _globals['_RANKINGRESPONSE']._serialized_end=420
+  _globals['_RANKINGSERVICE']._serialized_start=423
+  _globals['_RANKINGSERVICE']._serialized_end=582
 # @@protoc_insertion_point(module_scope)
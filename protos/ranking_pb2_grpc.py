@@ -39,6 +39,11 @@ class RankingServiceStub(object):
                 request_serializer=ranking__pb2.RankingRequest.SerializeToString,
                 response_deserializer=ranking__pb2.RankingResponse.FromString,
                 _registered_method=True)
+        self.StreamRanking = channel.stream_stream(
+                '/ranking.RankingService/StreamRanking',
+                request_serializer=ranking__pb2.RankingRequest.SerializeToString,
+                response_deserializer=ranking__pb2.RankingResponse.FromString,
+                _registered_method=True)
 
 
 class RankingServiceServicer(object):
@@ -50,6 +55,13 @@ class RankingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamRanking(self, request_iterator, context):
+        """Each request holds one chunk of reports and gets one response with its rankings
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RankingServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +70,11 @@ def add_RankingServiceServicer_to_server(servicer, server):
                     request_deserializer=ranking__pb2.RankingRequest.FromString,
                     response_serializer=ranking__pb2.RankingResponse.SerializeToString,
             ),
+            'StreamRanking': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamRanking,
+                    request_deserializer=ranking__pb2.RankingRequest.FromString,
+                    response_serializer=ranking__pb2.RankingResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ranking.RankingService', rpc_method_handlers)
@@ -95,3 +112,30 @@ class RankingService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamRanking(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/ranking.RankingService/StreamRanking',
+            ranking__pb2.RankingRequest.SerializeToString,
+            ranking__pb2.RankingResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
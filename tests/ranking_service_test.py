@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from auxiliary_service import server
+from auxiliary_service.server import RankingService
+from protos import ranking_pb2 as pb2
+
+
+CURRENT_TIME = 1767268800  # 2026-01-01 12:00:00 UTC
+
+
+def _get_reports():
+    return [
+        pb2.Report(id=1, timestamp="2026-01-01 11:00:00", upvote_count=3, comment_count=0),
+        pb2.Report(id=2, timestamp="2026-01-01 09:30:00.250000", upvote_count=10, comment_count=4),
+        pb2.Report(id=3, timestamp="2026-01-01 11:59:59.999999", upvote_count=1, comment_count=1),
+        pb2.Report(id=4, timestamp="2025-12-24 12:00:00", upvote_count=0, comment_count=2),
+    ]
+
+class TestRankingService:
+
+    # Batch scores match the per-report scores
+    def test_batch_matches_per_report(self):
+        pytest.importorskip("numpy")
+        service = RankingService()
+        reports = _get_reports()
+        batch = service.calculate_urgency_batch(
+            [report.timestamp for report in reports],
+            [report.upvote_count for report in reports],
+            [report.comment_count for report in reports],
+            CURRENT_TIME,
+        )
+        for report, score in zip(reports, batch):
+            expected = service.calculate_urgency(
+                report.timestamp, report.upvote_count, report.comment_count, CURRENT_TIME
+            )
+            assert score == pytest.approx(expected)
+
+    # Invalid timestamps are treated as reports created right now
+    def test_batch_invalid_timestamp(self):
+        pytest.importorskip("numpy")
+        service = RankingService()
+        batch = service.calculate_urgency_batch(
+            ["not a timestamp", ""], [2, 2], [0, 0], CURRENT_TIME
+        )
+        assert list(batch) == [7200.0, 7200.0]
+
+    # Scores are the same with and without NumPy
+    def test_calculate_ranking_fallback(self, monkeypatch):
+        service = RankingService()
+        request = pb2.RankingRequest(reports=_get_reports())
+        monkeypatch.setattr(time, "time", lambda: CURRENT_TIME)
+        response = service.CalculateRanking(request, None)
+        monkeypatch.setattr(server, "np", None)
+        fallback = service.CalculateRanking(request, None)
+        assert response.success and fallback.success
+        assert [r.report_id for r in response.rankings] == [1, 2, 3, 4]
+        for ranking, expected in zip(response.rankings, fallback.rankings):
+            assert ranking.score == pytest.approx(expected.score)
+
+    # Requests of packed columns are answered with columns and the same scores
+    def test_calculate_ranking_columns(self, monkeypatch):
+        service = RankingService()
+        reports = _get_reports()
+        request = pb2.RankingRequest(
+            report_ids=[report.id for report in reports],
+            timestamps=[report.timestamp for report in reports],
+            upvote_counts=[report.upvote_count for report in reports],
+            comment_counts=[report.comment_count for report in reports],
+        )
+        monkeypatch.setattr(time, "time", lambda: CURRENT_TIME)
+        response = service.CalculateRanking(request, None)
+        expected = service.CalculateRanking(pb2.RankingRequest(reports=reports), None)
+        assert response.success and not response.rankings
+        assert list(response.report_ids) == [1, 2, 3, 4]
+        assert list(response.scores) == [ranking.score for ranking in expected.rankings]
+
+    # Columns of different lengths are rejected
+    def test_calculate_ranking_uneven_columns(self):
+        request = pb2.RankingRequest(report_ids=[1, 2], timestamps=["2026-01-01 11:00:00"],
+                                     upvote_counts=[1, 2], comment_counts=[0, 0])
+        response = RankingService().CalculateRanking(request, None)
+        assert not response.success
+
+    # Every streamed chunk is answered with the rankings of that chunk
+    def test_stream_ranking(self):
+        service = RankingService()
+        reports = _get_reports()
+        requests = [
+            pb2.RankingRequest(reports=reports[:3]),
+            pb2.RankingRequest(reports=reports[3:]),
+        ]
+        responses = list(service.StreamRanking(iter(requests), None))
+        assert [len(response.rankings) for response in responses] == [3, 1]
+        assert responses[1].rankings[0].report_id == 4
+
+    # Ranked reports and RPCs are reported in the Prometheus text format
+    def test_metrics(self):
+        service = RankingService()
+        reports = _get_reports()
+        before = server.REPORTS_RANKED.values().get((), 0)
+        list(service.StreamRanking(iter([pb2.RankingRequest(reports=reports)]), None))
+        assert server.REPORTS_RANKED.values()[()] == before + len(reports)
+        assert 'ranking_service_rpcs_total{method="StreamRanking"}' in server.metrics.render()
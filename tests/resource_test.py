@@ -1,15 +1,41 @@
 import os
+import gzip
 import json
+import logging
+import subprocess
+import sys
 import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
 
+import grpc
+import jsonschema
 import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
 from flask.testing import FlaskClient
 from click.testing import CliRunner
 from werkzeug.datastructures import Headers
 
-from issue_api import create_app, db
-from issue_api.utils import API_KEY_HEADER
-from issue_api.models import ReportType, User, Report, ApiKey, Comment, reset_db, create_admin_user
+from issue_api import create_app, db, utils
+from issue_api.utils import (
+    API_KEY_HEADER,
+    AuthCache,
+    AuthenticatedUser,
+    encode_cursor,
+    get_schema_validator,
+    load_json_schema,
+)
+from issue_api.models import (
+    ReportType, User, Report, ApiKey, Comment, RankingState, reset_db, create_admin_user,
+    update_report_counts, upvotes
+)
+from issue_api.ranking_worker import RankingWorker
+from issue_api import rpc_client
+from issue_api.metrics import MetricsRegistry
+from issue_api.resources import report as report_resources
+from protos import ranking_pb2 as pb2
 
 
 RESOURCE_AMOUNT = 3
@@ -38,6 +64,7 @@ def app():
     config = {
         "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_file_name,
         "TESTING": True,
+        "RANKING_UPDATE_MODE": "inline",
     }
 
     app = create_app(config)
@@ -64,6 +91,53 @@ def client(app):
     app.test_client_class = AuthHeaderClient
     yield app.test_client()
 
+@pytest.fixture
+def timed_app(app):
+    timed_app = create_app({
+        "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        "TESTING": True,
+        "RANKING_UPDATE_MODE": "inline",
+        "REQUEST_TIMING": True,
+    })
+    timed_app.test_client_class = AuthHeaderClient
+    with timed_app.app_context():
+        yield timed_app
+        db.session.remove()
+        db.engine.dispose()
+
+class FakeRankingStub:
+    """Ranking service stub that records requests and scores reports by id."""
+
+    requests = []
+
+    def __init__(self, _channel):
+        pass
+
+    def CalculateRanking(self, request):
+        FakeRankingStub.requests.append(request)
+        if request.reports:
+            return pb2.RankingResponse(success=True, rankings=[
+                pb2.Ranking(report_id=report.id, score=float(report.id))
+                for report in request.reports
+            ])
+        return pb2.RankingResponse(success=True, report_ids=request.report_ids,
+                                   scores=[float(report_id) for report_id in request.report_ids])
+
+    def StreamRanking(self, request_iterator):
+        for request in request_iterator:
+            yield self.CalculateRanking(request)
+
+class UnimplementedError(grpc.RpcError):
+
+    def code(self):
+        return grpc.StatusCode.UNIMPLEMENTED
+
+@pytest.fixture
+def ranking_stub(monkeypatch):
+    FakeRankingStub.requests = []
+    monkeypatch.setattr(rpc_client.pb2_grpc, "RankingServiceStub", FakeRankingStub)
+    yield FakeRankingStub
+
 def _populate_db():
     for i in range(1, RESOURCE_AMOUNT + 1):
         report_type = ReportType(
@@ -112,6 +186,38 @@ def _populate_db():
     db.session.add(db_key)
 
     db.session.commit()
+    update_report_counts()
+
+def _add_comments(report_id, amount):
+    report = db.session.get(Report, report_id)
+    for i in range(amount):
+        user = User(name=f"extra-user-{report_id}-{i}")
+        db.session.add(Comment(user=user, report=report, text=f"extra-text-{i}"))
+    db.session.commit()
+
+@contextmanager
+def _count_queries():
+    statements = []
+    def on_execute(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+
+def _report_versions():
+    return dict(db.session.execute(db.select(Report.id, Report.version)).all())
+
+def _query_plan(statement):
+    compiled = statement.compile(dialect=db.engine.dialect,
+                                 compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    positional = tuple(params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), positional
+    ).all()
+    return [row[-1] for row in rows]
 
 def _get_report_type_json(number=1):
     return {
@@ -152,6 +258,19 @@ class TestReportTypeCollection:
         for item in body:
             assert "name" in item
 
+    # GET with a matching If-None-Match returns 304 until report types change
+    def test_get_not_modified(self, client):
+        resp = client.get(self.RESOURCE_URL)
+        etag = resp.headers["ETag"]
+        resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+        resp = client.post(self.RESOURCE_URL, json=_get_report_type_json())
+        assert resp.status_code == 201
+        resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
     # POST a valid report type
     def test_post(self, client):
         valid = _get_report_type_json()
@@ -269,6 +388,112 @@ class TestReportCollection:
             assert "user_name" in item
             assert item["user_name"] == "test-user-1"
 
+    # GET with a matching If-None-Match returns 304 until reports change
+    def test_get_not_modified(self, client):
+        resp = client.get(self.RESOURCE_URL)
+        etag = resp.headers["ETag"]
+        with _count_queries() as statements:
+            resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert len(statements) == 1
+        # Weak comparison, as proxies may mark the tag as weak
+        resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": f"W/{etag}"})
+        assert resp.status_code == 304
+        # Invalid arguments are rejected before the ETag is checked
+        resp = client.get(f"{self.RESOURCE_URL}?limit=abc", headers={"If-None-Match": etag})
+        assert resp.status_code == 400
+        resp = client.post("/api/reports/1/upvote/4/")
+        assert resp.status_code == 201
+        resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+    # GET runs the same number of queries regardless of the amount of reports
+    def test_get_query_count(self, client):
+        with _count_queries() as statements:
+            client.get(self.RESOURCE_URL)
+        baseline = len(statements)
+        for i in range(5):
+            db.session.add(Report(
+                user=User(name=f"extra-user-{i}"),
+                report_type=ReportType(name=f"extra-report_type-{i}"),
+                description="extra-description",
+                location="extra-location",
+            ))
+        db.session.commit()
+        with _count_queries() as statements:
+            resp = client.get(self.RESOURCE_URL)
+        assert len(json.loads(resp.data)) == RESOURCE_AMOUNT + 5
+        assert len(statements) == baseline
+
+    # GET reports one page at a time by following the next links
+    def test_get_paginated(self, client):
+        resp = client.get(self.RESOURCE_URL + "?limit=2")
+        assert resp.status_code == 200
+        first_page = json.loads(resp.data)
+        assert len(first_page) == 2
+        assert "Next-Cursor" in resp.headers
+        assert 'rel="next"' in resp.headers["Link"]
+        next_url = resp.headers["Link"].split(">")[0].lstrip("<")
+        resp = client.get(next_url)
+        assert resp.status_code == 200
+        second_page = json.loads(resp.data)
+        assert len(second_page) == 1
+        assert "Link" not in resp.headers
+        ids = [item["id"] for item in first_page + second_page]
+        assert sorted(ids) == list(range(1, RESOURCE_AMOUNT + 1))
+
+    # GET paginated reports for a specific user
+    def test_get_paginated_filtered(self, client):
+        resp = client.get(self.RESOURCE_URL + "?user_id=2&limit=1")
+        assert resp.status_code == 200
+        body = json.loads(resp.data)
+        assert len(body) == 1
+        assert body[0]["user_name"] == "test-user-2"
+        assert "Link" not in resp.headers
+
+    # GET reports most urgent first, one page at a time
+    def test_get_sorted_by_urgency(self, app, client):
+        with app.app_context():
+            for report in Report.query.all():
+                report.urgency_score = [0.5, 2.0, 0.5][report.id - 1]
+            db.session.commit()
+        resp = client.get(self.RESOURCE_URL + "?sort=urgency")
+        assert [item["id"] for item in json.loads(resp.data)] == [2, 3, 1]
+
+        resp = client.get(self.RESOURCE_URL + "?sort=urgency&limit=2")
+        assert [item["id"] for item in json.loads(resp.data)] == [2, 3]
+        next_url = resp.headers["Link"].split(">")[0].lstrip("<")
+        assert "sort=urgency" in next_url
+        resp = client.get(next_url)
+        assert [item["id"] for item in json.loads(resp.data)] == [1]
+        assert "Link" not in resp.headers
+
+    # GET reports by urgency leaves out reports that have not been ranked
+    def test_get_sorted_by_urgency_unranked(self, app, client):
+        with app.app_context():
+            for report in Report.query.all():
+                report.urgency_score = None if report.id == 1 else 1.0
+            db.session.commit()
+        resp = client.get(self.RESOURCE_URL + "?sort=urgency&limit=5")
+        assert sorted(item["id"] for item in json.loads(resp.data)) == [2, 3]
+
+    # GET with invalid sort, limit or cursor
+    def test_get_paginated_invalid(self, client):
+        resp = client.get(self.RESOURCE_URL + "?limit=0")
+        assert resp.status_code == 400
+        resp = client.get(self.RESOURCE_URL + "?limit=abc")
+        assert resp.status_code == 400
+        resp = client.get(self.RESOURCE_URL + "?cursor=notacursor")
+        assert resp.status_code == 400
+        resp = client.get(self.RESOURCE_URL + "?sort=oldest")
+        assert resp.status_code == 400
+        # Urgency cursors only take finite numbers as keys
+        for key, report_id in [(True, 1), (float("nan"), 1), (float("inf"), 1), (1.0, True)]:
+            cursor = encode_cursor(key, report_id)
+            resp = client.get(self.RESOURCE_URL + f"?sort=urgency&cursor={cursor}")
+            assert resp.status_code == 400
+
     # POST valid report
     def test_post(self, client):
         valid = _get_report_json()
@@ -304,6 +529,105 @@ class TestReportCollection:
         resp = client.post(self.RESOURCE_URL, headers={API_KEY_HEADER: "wrongkey"})
         assert resp.status_code == 401
 
+class TestReportBatch:
+
+    RESOURCE_URL = "/api/reports/batch/"
+
+    # POST a batch of valid reports with one insert and one ranking update
+    def test_post(self, app, client):
+        updates = []
+        app.extensions["ranking_worker"].update_func = lambda: updates.append(1)
+        batch = [_get_report_json(i, report_type_id=i % RESOURCE_AMOUNT + 1) for i in range(10)]
+        with _count_queries() as statements:
+            resp = client.post(self.RESOURCE_URL, json=batch)
+        assert resp.status_code == 201
+        body = json.loads(resp.data)
+        assert [item["status"] for item in body] == [201] * 10
+        assert len([s for s in statements if s.startswith("INSERT INTO report ")]) == 1
+        assert len(updates) == 1
+        resp = client.get(body[3]["location"])
+        assert json.loads(resp.data)["description"] == "new-report-3"
+        resp = client.get("/api/reports/")
+        assert len(json.loads(resp.data)) == RESOURCE_AMOUNT + 10
+
+    # POST a batch with some invalid reports creates only the valid ones
+    def test_post_partial(self, client):
+        invalid = _get_report_json(2)
+        invalid["location"] = "A" * 65
+        batch = [_get_report_json(1), invalid, _get_report_json(3, report_type_id=999)]
+        resp = client.post(self.RESOURCE_URL, json=batch)
+        assert resp.status_code == 207
+        body = json.loads(resp.data)
+        assert [item["status"] for item in body] == [201, 400, 400]
+        assert "location" in body[0]
+        assert "999" in body[2]["message"]
+        resp = client.get("/api/reports/")
+        assert len(json.loads(resp.data)) == RESOURCE_AMOUNT + 1
+
+    # POST a batch without any valid reports
+    def test_post_invalid(self, client):
+        resp = client.post(self.RESOURCE_URL, json=[{"description": "no location"}])
+        assert resp.status_code == 400
+        assert json.loads(resp.data)[0]["status"] == 400
+        resp = client.post(self.RESOURCE_URL, json=[])
+        assert resp.status_code == 400
+        resp = client.post(self.RESOURCE_URL, json=_get_report_json())
+        assert resp.status_code == 400
+
+    # POST with invalid API key
+    def test_unauthorized(self, client):
+        resp = client.post(self.RESOURCE_URL, headers={API_KEY_HEADER: "wrongkey"})
+        assert resp.status_code == 401
+
+class TestReportExport:
+
+    RESOURCE_URL = "/api/reports/export/"
+
+    # GET all reports as newline delimited JSON
+    def test_get(self, client):
+        resp = client.get(self.RESOURCE_URL)
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/x-ndjson"
+        lines = resp.data.decode().splitlines()
+        reports = [json.loads(line) for line in lines]
+        assert [report["id"] for report in reports] == list(range(1, RESOURCE_AMOUNT + 1))
+        assert reports[0] == json.loads(client.get("/api/reports/?user_id=1").data)[0]
+
+    # Reports are loaded and written out one chunk at a time
+    def test_get_chunked(self, client, monkeypatch):
+        monkeypatch.setattr(report_resources, "EXPORT_CHUNK_SIZE", 2)
+        resp = client.get(self.RESOURCE_URL, buffered=False)
+        chunks = list(resp.response)
+        assert [chunk.count(b"\n") for chunk in chunks] == [2, 1]
+        resp.close()
+
+    # GET reports filtered by creation time and report type
+    def test_get_filtered(self, app, client):
+        with app.app_context():
+            report = db.session.get(Report, 1)
+            report.timestamp = datetime(2020, 1, 1)
+            db.session.commit()
+        resp = client.get(self.RESOURCE_URL + "?since=2021-01-01T00:00:00Z")
+        ids = [json.loads(line)["id"] for line in resp.data.decode().splitlines()]
+        assert ids == [2, 3]
+        resp = client.get(self.RESOURCE_URL + "?report_type=2")
+        ids = [json.loads(line)["id"] for line in resp.data.decode().splitlines()]
+        assert ids == [2]
+
+    # GET compressed with gzip
+    def test_get_gzip(self, client):
+        resp = client.get(self.RESOURCE_URL, headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        lines = gzip.decompress(resp.data).decode().splitlines()
+        assert len(lines) == RESOURCE_AMOUNT
+
+    # GET with invalid filters
+    def test_get_invalid(self, client):
+        resp = client.get(self.RESOURCE_URL + "?since=yesterday")
+        assert resp.status_code == 400
+        resp = client.get(self.RESOURCE_URL + "?report_type=abc")
+        assert resp.status_code == 400
+
 class TestReportItem:
 
     RESOURCE_URL = "/api/reports/1/"
@@ -326,6 +650,39 @@ class TestReportItem:
         assert "comments" in body
         assert len(body["comments"]) == 1
 
+    # GET with a matching If-None-Match returns 304 until the report changes
+    def test_get_not_modified(self, client):
+        etag = client.get(self.RESOURCE_URL).headers["ETag"]
+        resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        other_etag = client.get("/api/reports/2/").headers["ETag"]
+        assert other_etag != etag
+
+        changes = [
+            lambda: client.post("/api/reports/1/comments/", json=_get_comment_json()),
+            lambda: client.delete("/api/comments/1/"),
+            lambda: client.put("/api/report-types/1/", json=_get_report_type_json()),
+            lambda: rpc_client._apply_rankings([(1, 2.0)], _report_versions()),
+            lambda: client.delete("/api/users/test-user-1/"),
+        ]
+        for change in changes:
+            change()
+            resp = client.get(self.RESOURCE_URL, headers={"If-None-Match": etag})
+            assert resp.status_code == 200
+            assert resp.headers["ETag"] != etag
+            etag = resp.headers["ETag"]
+
+    # GET runs the same number of queries regardless of the amount of comments
+    def test_get_query_count(self, client):
+        with _count_queries() as statements:
+            client.get(self.RESOURCE_URL)
+        baseline = len(statements)
+        _add_comments(1, 5)
+        with _count_queries() as statements:
+            resp = client.get(self.RESOURCE_URL)
+        assert len(json.loads(resp.data)["comments"]) == 6
+        assert len(statements) == baseline
+
     # PUT valid report
     def test_put(self, client):
         valid = _get_report_json()
@@ -359,6 +716,167 @@ class TestReportItem:
         resp = client.delete(self.RESOURCE_URL, headers={API_KEY_HEADER: f"{TEST_USER_KEY}-2"})
         assert resp.status_code == 403
         
+class TestRankingStatus:
+
+    RESOURCE_URL = "/api/rankings/"
+
+    # GET before rankings have ever been calculated
+    def test_get_never_refreshed(self, client):
+        resp = client.get(self.RESOURCE_URL)
+        assert resp.status_code == 200
+        body = json.loads(resp.data)
+        assert body["last_refreshed"] is None
+
+    # GET after a ranking update
+    def test_get(self, client):
+        RankingState.get().refreshed_at = datetime(2026, 1, 1, 12, 0)
+        db.session.commit()
+        resp = client.get(self.RESOURCE_URL)
+        assert resp.status_code == 200
+        body = json.loads(resp.data)
+        assert body["last_refreshed"].startswith("2026-01-01T12:00")
+
+class TestRankingWorker:
+
+    # A burst of update requests is coalesced into a single update
+    def test_coalesce(self, app):
+        calls = []
+        app.config["RANKING_UPDATE_MODE"] = "background"
+        app.config["RANKING_UPDATE_DELAY"] = 0.2
+        worker = RankingWorker(app, update_func=lambda: calls.append(time.time()))
+        for _ in range(20):
+            worker.request_update()
+        time.sleep(0.5)
+        worker.stop(timeout=1)
+        assert len(calls) == 1
+
+    # Database maintenance runs in the worker thread once its interval has passed
+    def test_maintenance(self, app):
+        maintenance = []
+        app.config["RANKING_UPDATE_MODE"] = "background"
+        app.config["RANKING_UPDATE_DELAY"] = 0.1
+        app.config["SQLITE_MAINTENANCE_INTERVAL"] = 0
+        worker = RankingWorker(app, update_func=lambda: None,
+                               maintenance_func=lambda: maintenance.append(time.time()))
+        worker.request_update()
+        time.sleep(0.3)
+        worker.stop(timeout=1)
+        assert maintenance
+
+    # Inline mode runs the update immediately
+    def test_inline(self, app):
+        calls = []
+        worker = RankingWorker(app, update_func=lambda: calls.append(time.time()))
+        worker.request_update()
+        worker.request_update()
+        assert len(calls) == 2
+
+    # The RPC client is loaded by the first update instead of at startup
+    def test_lazy_rpc_client(self, app, ranking_stub):
+        worker = app.extensions["ranking_worker"]
+        assert worker.update_func is None
+        worker.run_update()
+        assert worker.update_func is rpc_client.update_rankings
+        assert ranking_stub.requests
+
+class TestUpdateRankings:
+
+    # Only reports changed since the previous update are ranked
+    def test_incremental(self, client, ranking_stub):
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests[-1].report_ids) == RESOURCE_AMOUNT
+        assert db.session.get(Report, 2).urgency_score == 2.0
+
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests) == 1
+
+        resp = client.post("/api/reports/2/comments/", json=_get_comment_json())
+        assert resp.status_code == 201
+        assert list(ranking_stub.requests[-1].report_ids) == [2]
+
+    # Full sweep ranks every report
+    def test_full_sweep(self, app, ranking_stub):
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests[-1].report_ids) == RESOURCE_AMOUNT
+        assert RankingState.get().full_sweep_at is not None
+
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests) == 1
+
+        app.config["RANKING_FULL_SWEEP_INTERVAL"] = 0
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests[-1].report_ids) == RESOURCE_AMOUNT
+
+    # Reports are streamed to the ranking service in chunks
+    def test_chunked(self, app, ranking_stub):
+        app.config["RANKING_CHUNK_SIZE"] = 2
+        rpc_client.update_rankings()
+        assert [len(request.report_ids) for request in ranking_stub.requests] == [2, 1]
+        for report in Report.query.all():
+            assert report.urgency_score == float(report.id)
+            assert not report.ranking_dirty
+
+    # Scores are written back with a single executemany UPDATE
+    def test_bulk_write_back(self, app):
+        rankings = [(report_id, 0.5) for report_id in (1, 2, 99999)]
+        with _count_queries() as statements:
+            rpc_client._apply_rankings(rankings, _report_versions())
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+        for report in Report.query.all():
+            assert (report.urgency_score == 0.5) == (report.id != 3)
+            assert report.ranking_dirty == (report.id == 3)
+
+    # Reports changed while the RPC runs stay dirty instead of taking a stale score
+    def test_changed_during_rpc(self, app, ranking_stub, monkeypatch):
+        stream_ranking = ranking_stub.StreamRanking
+
+        def change_report(self, request_iterator):
+            requests = list(request_iterator)
+            db.session.execute(
+                db.update(Report).where(Report.id == 2)
+                .values(upvote_count=Report.upvote_count + 1, ranking_dirty=True,
+                        version=Report.version + 1)
+            )
+            db.session.commit()
+            yield from stream_ranking(self, iter(requests))
+        monkeypatch.setattr(ranking_stub, "StreamRanking", change_report)
+        rpc_client.update_rankings()
+        for report in Report.query.all():
+            assert report.ranking_dirty == (report.id == 2)
+            assert (report.urgency_score is None) == (report.id == 2)
+
+        monkeypatch.setattr(ranking_stub, "StreamRanking", stream_ranking)
+        rpc_client.update_rankings()
+        assert list(ranking_stub.requests[-1].report_ids) == [2]
+        assert not db.session.get(Report, 2).ranking_dirty
+
+    # Fall back to the unary RPC when the service does not support streaming
+    def test_unary_fallback(self, app, ranking_stub, monkeypatch):
+        def unimplemented(_self, request_iterator):
+            next(request_iterator)
+            raise UnimplementedError()
+        monkeypatch.setattr(ranking_stub, "StreamRanking", unimplemented)
+        app.config["RANKING_CHUNK_SIZE"] = 2
+        rpc_client.update_rankings()
+        assert len(ranking_stub.requests) == 1
+        assert len(ranking_stub.requests[0].reports) == RESOURCE_AMOUNT
+
+class TestChannelManager:
+
+    # The channel is opened once per process and reused
+    def test_reuse(self, monkeypatch):
+        manager = rpc_client.ChannelManager()
+        channel = manager.get_channel()
+        assert manager.get_channel() is channel
+        monkeypatch.setattr(rpc_client.os, "getpid", lambda: -1)
+        assert manager.get_channel() is not channel
+        manager.close()
+        channel.close()
+
+    # Stubs share the process-wide channel
+    def test_stub_factory(self, ranking_stub):
+        assert isinstance(rpc_client.get_ranking_stub(), ranking_stub)
+
 class TestCommentCollection:
 
     RESOURCE_URL = "/api/reports/1/comments/"
@@ -368,6 +886,7 @@ class TestCommentCollection:
         valid = _get_comment_json()
         resp = client.post(self.RESOURCE_URL, json=valid)
         assert resp.status_code == 201
+        assert db.session.get(Report, 1).comment_count == 2
         
     # POST wrong media type (text/plain)
     def test_post_wrong_media_type(self, client):
@@ -405,6 +924,7 @@ class TestCommentItem:
     def test_delete(self, client):
         resp = client.delete(self.RESOURCE_URL)
         assert resp.status_code == 204
+        assert db.session.get(Report, 1).comment_count == 0
 
     # DELETE nonexistent comment
     def test_delete_not_found(self, client):
@@ -432,11 +952,13 @@ class TestReportUpvote:
     def test_post(self, client):
         resp = client.post(self.RESOURCE_URL_ADMIN)
         assert resp.status_code == 201
+        assert db.session.get(Report, 1).upvote_count == 2
     
     # DELETE with valid API key
     def test_delete(self, client):
         resp = client.delete(self.RESOURCE_URL_USER, headers={API_KEY_HEADER: f"{TEST_USER_KEY}-1"})
         assert resp.status_code == 204
+        assert db.session.get(Report, 1).upvote_count == 0
     
     # POST upvote when already upvoted
     def test_conflict(self, client):
@@ -562,17 +1084,374 @@ class TestUserItem:
     def test_delete(self, client):
         resp = client.delete(self.RESOURCE_URL)
         assert resp.status_code == 204
+        assert db.session.get(Report, 1).upvote_count == 0
 
     # DELETE nonexistent user
     def test_delete_not_found(self, client):
         resp = client.delete(self.INVALID_URL)
         assert resp.status_code == 404
 
+    # DELETE invalidates the cached API key of the user
+    def test_delete_invalidates_auth_cache(self, client):
+        headers = {API_KEY_HEADER: f"{TEST_USER_KEY}-1"}
+        resp = client.get(self.RESOURCE_URL, headers=headers)
+        assert resp.status_code == 200
+        resp = client.delete(self.RESOURCE_URL, headers=headers)
+        assert resp.status_code == 204
+        # A cached key of a non-admin would get 403 here
+        resp = client.get("/api/users/", headers=headers)
+        assert resp.status_code == 401
+
     # Only allow DELETE with admin key or correct user key
     def test_delete_forbidden(self, client):
         resp = client.delete(self.RESOURCE_URL, headers={API_KEY_HEADER: f"{TEST_USER_KEY}-2"})
         assert resp.status_code == 403
 
+class TestSchemaValidator:
+
+    INVALID_REPORTS = [
+        [],
+        {},
+        {"description": "test"},
+        {"description": 1, "location": "test"},
+        {"description": "A" * 129, "location": "test"},
+        {"description": "test", "location": "test", "report_type_id": True},
+        {"description": "test", "location": "test", "report_type_id": "1"},
+    ]
+
+    # Validators are compiled once per schema file
+    def test_cached(self):
+        assert get_schema_validator("report.json") is get_schema_validator("report.json")
+
+    # The flat schemas are all served by the fast path
+    def test_fast_path(self):
+        for file_name in ["report.json", "comment.json", "user.json", "report_type.json"]:
+            assert get_schema_validator(file_name).fast_path is not None
+        validator = get_schema_validator("report.json")
+        assert validator.is_fast_valid(_get_report_json())
+        assert validator.is_fast_valid({"description": "test", "location": "test",
+                                        "report_type_id": 1.5})
+
+    # Invalid documents raise the same errors as jsonschema.validate
+    def test_errors(self):
+        validator = get_schema_validator("report.json")
+        schema = load_json_schema("report.json")
+        for instance in self.INVALID_REPORTS:
+            assert not validator.is_fast_valid(instance)
+            with pytest.raises(jsonschema.ValidationError) as expected:
+                jsonschema.validate(instance, schema)
+            with pytest.raises(jsonschema.ValidationError) as actual:
+                validator.validate(instance)
+            assert actual.value.message == expected.value.message
+
+class TestJsonRepresentation:
+
+    DATA = {"timestamp": datetime(2026, 1, 1, 12, 30), "name": "ääkkönen", "count": 1}
+
+    # Responses are compact JSON with ISO 8601 timestamps
+    def test_get(self, client):
+        resp = client.get("/api/reports/1/")
+        assert resp.mimetype == "application/json"
+        assert b"\n" not in resp.data.strip() and b": " not in resp.data
+        timestamp = json.loads(resp.data)["timestamp"]
+        assert datetime.fromisoformat(timestamp)
+        assert "T" in timestamp
+
+    # The standard library fallback gives the same output as orjson
+    def test_stdlib_fallback(self, monkeypatch):
+        fast = utils.dump_json(self.DATA)
+        monkeypatch.setattr(utils, "orjson", None)
+        assert utils.dump_json(self.DATA) == fast
+        assert json.loads(fast)["timestamp"] == "2026-01-01T12:30:00"
+        with pytest.raises(TypeError):
+            utils.dump_json({"value": object()})
+
+class TestRequestTiming:
+
+    # Responses have no Server-Timing header unless timing is enabled
+    def test_disabled(self, client):
+        resp = client.get("/api/reports/")
+        assert "Server-Timing" not in resp.headers
+
+    # SQL statements, validation, serialization and ranking updates are timed
+    def test_server_timing(self, timed_app, ranking_stub, caplog):
+        client = timed_app.test_client()
+        with _count_queries() as statements:
+            resp = client.get("/api/reports/")
+        metrics = {
+            metric.split(";")[0]: metric for metric in resp.headers["Server-Timing"].split(", ")
+        }
+        assert f'desc="{len(statements)} SQL statements"' in metrics["sql"]
+        assert {"sql", "serialize", "total"} <= set(metrics)
+
+        with caplog.at_level(logging.INFO, logger="issue_api.timing"):
+            resp = client.post("/api/reports/", json=_get_report_json())
+        assert resp.status_code == 201
+        metrics = resp.headers["Server-Timing"]
+        assert "validate;dur=" in metrics and "ranking;dur=" in metrics
+        record = json.loads(caplog.records[-1].getMessage().split(" ", 1)[1])
+        assert record["method"] == "POST" and record["status"] == 201
+        assert record["sql_count"] > 0 and "sql" not in record
+
+    # Slow requests are logged with their SQL statements
+    def test_slow_request(self, timed_app, caplog):
+        client = timed_app.test_client()
+        timed_app.config["SLOW_REQUEST_THRESHOLD"] = 0
+        with caplog.at_level(logging.WARNING, logger="issue_api.timing"):
+            client.get("/api/reports/1/")
+        assert caplog.records[-1].levelname == "WARNING"
+        record = json.loads(caplog.records[-1].getMessage().split(" ", 2)[2])
+        assert record["path"] == "/api/reports/1/"
+        assert any("FROM report" in sql["statement"] for sql in record["sql"])
+
+class UnavailableError(grpc.RpcError):
+
+    def code(self):
+        return grpc.StatusCode.UNAVAILABLE
+
+class TestMetrics:
+
+    # Only admins can read the metrics
+    def test_admin_only(self, client):
+        resp = client.get("/api/metrics", headers={API_KEY_HEADER: ""})
+        assert resp.status_code == 401
+        resp = client.get("/api/metrics", headers={API_KEY_HEADER: f"{TEST_USER_KEY}-1"})
+        assert resp.status_code == 403
+
+    # Requests, latencies, auth cache lookups and the database pool are reported
+    def test_request_metrics(self, client):
+        client.get("/api/reports/")
+        client.get("/api/reports/1/")
+        client.get("/api/users/")
+        resp = client.get("/api/metrics")
+        assert resp.status_code == 200
+        assert resp.content_type.startswith("text/plain; version=0.0.4")
+        lines = resp.get_data(as_text=True).splitlines()
+        assert 'issue_api_requests_total{method="GET",route="/api/reports/",status="200"} 1' \
+            in lines
+        assert 'issue_api_request_duration_seconds_bucket{method="GET",' \
+            'route="/api/reports/<report:report>/",le="+Inf"} 1' in lines
+        assert 'issue_api_auth_cache_requests_total{result="miss"} 1' in lines
+        assert 'issue_api_auth_cache_requests_total{result="hit"} 1' in lines
+        assert "# TYPE issue_api_db_pool_checked_out gauge" in lines
+
+    # Ranking RPC latency and failures are counted
+    def test_ranking_rpc_metrics(self, app, ranking_stub, monkeypatch):
+        metrics = app.extensions["metrics"]
+        rpc_client.update_rankings()
+        assert sum(metrics.ranking_rpc_duration.values()[()][:-1]) == 1
+
+        def unavailable(_self, request_iterator):
+            raise UnavailableError()
+        monkeypatch.setattr(ranking_stub, "StreamRanking", unavailable)
+        app.config["RANKING_FULL_SWEEP_INTERVAL"] = 0
+        app.extensions["ranking_worker"].run_update()
+        assert metrics.ranking_rpc_failures.values() == {("UNAVAILABLE",): 1}
+
+    # Responses with success=false count as failures and are not a refresh
+    def test_ranking_unsuccessful(self, app, ranking_stub, monkeypatch, caplog):
+        metrics = app.extensions["metrics"]
+
+        def unsuccessful(_self, request_iterator):
+            for _request in request_iterator:
+                yield pb2.RankingResponse(success=False, message="Invalid data")
+        monkeypatch.setattr(ranking_stub, "StreamRanking", unsuccessful)
+        rpc_client.update_rankings(full=True)
+        assert metrics.ranking_rpc_failures.values() == {("UNSUCCESSFUL",): 1}
+        assert "Invalid data" in caplog.text
+        assert RankingState.get().refreshed_at is None
+        assert all(report.ranking_dirty for report in Report.query.all())
+
+    # Metrics of all processes sharing a directory are merged
+    def test_multiprocess(self, tmp_path):
+        registry = MetricsRegistry(str(tmp_path))
+        requests = registry.counter("requests_total", "Requests", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        registry.gauge("connections", "Connections", callback=lambda: 2)
+        requests.inc(route="/a")
+        latency.observe(0.5)
+        registry.flush()
+        # Pretend the file was written by a running and by an exited process
+        snapshot = (tmp_path / f"metrics-{os.getpid()}.json").read_text()
+        (tmp_path / f"metrics-{os.getppid()}.json").write_text(snapshot)
+        (tmp_path / f"metrics-{2 ** 22 + 1}.json").write_text(snapshot)
+        requests.inc(route="/b")
+
+        lines = registry.render().splitlines()
+        assert 'requests_total{route="/a"} 3' in lines
+        assert 'requests_total{route="/b"} 1' in lines
+        assert 'latency_seconds_bucket{le="0.1"} 0' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert "latency_seconds_sum 1.5" in lines
+        assert "connections 4" in lines
+
+    # Requests start a thread that flushes the metrics without waiting for the next request
+    def test_flush_thread(self, tmp_path):
+        registry = MetricsRegistry(str(tmp_path), flush_interval=0.05)
+        registry.counter("requests_total", "Requests").inc()
+        registry.ensure_flushing()
+        thread = registry._thread._thread
+        registry.ensure_flushing()
+        assert registry._thread._thread is thread
+        time.sleep(0.3)
+        registry.stop(timeout=1)
+        assert not thread.is_alive()
+        snapshot = json.loads((tmp_path / f"metrics-{os.getpid()}.json").read_text())
+        assert snapshot["requests_total"]["values"] == [[[], 1]]
+
+    # Metrics recorded after the last flush are written when the process exits
+    def test_flush_at_exit(self, tmp_path):
+        script = ("import sys\n"
+                  "from issue_api.metrics import MetricsRegistry\n"
+                  "registry = MetricsRegistry(sys.argv[1], flush_interval=3600)\n"
+                  "registry.counter('requests_total', 'Requests').inc(5)\n"
+                  "print(__import__('os').getpid())\n")
+        output = subprocess.run([sys.executable, "-c", script, str(tmp_path)], check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                capture_output=True, text=True).stdout
+        snapshot = json.loads((tmp_path / f"metrics-{output.strip()}.json").read_text())
+        assert snapshot["requests_total"]["values"] == [[[], 5]]
+
+class TestAuthCache:
+
+    # Authenticated requests do not query API keys on a cache hit
+    def test_cache_hit(self, client):
+        client.get("/api/users/")
+        with _count_queries() as statements:
+            resp = client.get("/api/users/")
+        assert resp.status_code == 200
+        assert not [s for s in statements if "api_key" in s]
+        with _count_queries() as statements:
+            resp = client.post("/api/reports/", json=_get_report_json())
+        assert resp.status_code == 201
+        assert not [s for s in statements if "api_key" in s]
+
+    # A write with a cached key of a user deleted through another worker is
+    # rejected and evicts the key instead of failing on the foreign key
+    def test_write_after_delete_elsewhere(self, app, client):
+        key = f"{TEST_USER_KEY}-1"
+        key_hash = ApiKey.key_hash(key)
+        app.extensions["auth_cache"].set(key_hash, AuthenticatedUser(1, False))
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+        resp = client.post("/api/reports/", json=_get_report_json(),
+                           headers={API_KEY_HEADER: key})
+        assert resp.status_code == 401
+        assert app.extensions["auth_cache"].get(key_hash) is None
+
+    # The least recently used entry is evicted when the cache is full
+    def test_lru(self):
+        cache = AuthCache(max_size=2, ttl=60)
+        cache.set(b"a", AuthenticatedUser(1, False))
+        cache.set(b"b", AuthenticatedUser(2, False))
+        assert cache.get(b"a").id == 1
+        cache.set(b"c", AuthenticatedUser(3, True))
+        assert cache.get(b"b") is None
+        assert cache.get(b"a").id == 1
+        assert cache.get(b"c").admin
+
+    # Entries expire after the time to live
+    def test_ttl(self, monkeypatch):
+        cache = AuthCache(max_size=2, ttl=10)
+        now = time.monotonic()
+        cache.set(b"a", AuthenticatedUser(1, False))
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+        assert cache.get(b"a") is None
+
+    # Invalidating a user removes all of their keys
+    def test_invalidate_user(self):
+        cache = AuthCache()
+        cache.set(b"a", AuthenticatedUser(1, False))
+        cache.set(b"b", AuthenticatedUser(1, False))
+        cache.set(b"c", AuthenticatedUser(2, False))
+        cache.invalidate_user(1)
+        assert cache.get(b"a") is None
+        assert cache.get(b"b") is None
+        assert cache.get(b"c").id == 2
+
+class TestSqlitePragmas:
+
+    # Connections use the configured pragma profile
+    def test_pragmas(self, app):
+        connection = db.session.connection()
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA temp_store").scalar() == 2
+        assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+    # Truncate the write-ahead log with optimize-db command
+    def test_optimize_db(self, app):
+        runner = app.test_cli_runner()
+        db.session.remove()
+        result = runner.invoke(args=["optimize-db"])
+        assert result.exit_code == 0
+        assert "Database optimized." in result.output
+
+class TestQueryPlans:
+
+    TIMESTAMP = datetime(2026, 1, 1)
+
+    def _assert_indexed(self, statement):
+        plan = _query_plan(statement)
+        for step in plan:
+            assert "INDEX" in step or "PRIMARY KEY" in step, plan
+            assert "TEMP B-TREE" not in step, plan
+
+    # Report listing and keyset pagination read the (timestamp, id) index
+    def test_report_listing(self, app):
+        query = (
+            db.select(Report)
+            .options(joinedload(Report.report_type), joinedload(Report.user))
+            .order_by(Report.timestamp.desc(), Report.id.desc())
+        )
+        self._assert_indexed(query.limit(26))
+        after_cursor = query.where(
+            db.tuple_(Report.timestamp, Report.id) < db.tuple_(self.TIMESTAMP, 5)
+        )
+        self._assert_indexed(after_cursor.limit(26))
+        assert "timestamp<?" in _query_plan(after_cursor.limit(26))[0]
+
+    # Report listing filtered by user
+    def test_report_user_filter(self, app):
+        self._assert_indexed(
+            db.select(Report)
+            .where(Report.user_id == 1)
+            .order_by(Report.timestamp.desc(), Report.id.desc())
+        )
+
+    # Loading the comments of reports
+    def test_comments(self, app):
+        self._assert_indexed(db.select(Comment).where(Comment.report_id.in_([1, 2])))
+
+    # Loading the reports a user has upvoted
+    def test_upvotes(self, app):
+        self._assert_indexed(
+            db.select(Report).join(upvotes).where(upvotes.c.user_id == 1)
+        )
+
+    # Ordering by urgency score and finding reports to rank
+    def test_ranking(self, app):
+        query = (
+            db.select(Report)
+            .where(Report.urgency_score.is_not(None))
+            .order_by(Report.urgency_score.desc(), Report.id.desc())
+        )
+        self._assert_indexed(query.limit(10))
+        after_cursor = query.where(
+            db.tuple_(Report.urgency_score, Report.id) < db.tuple_(0.5, 5)
+        )
+        self._assert_indexed(after_cursor.limit(10))
+        assert "urgency_score<?" in _query_plan(after_cursor.limit(10))[0]
+        plan = _query_plan(
+            db.select(Report.id).where(Report.ranking_dirty, Report.id > 0).order_by(Report.id)
+        )
+        assert "ix_report_ranking_dirty" in plan[0]
+
+    # Filtering reports by report type
+    def test_report_type_filter(self, app):
+        self._assert_indexed(db.select(Report).where(Report.report_type_id == 1))
+
 class TestClickCommands:
 
     # Reset the database with reset-db command
@@ -587,6 +1466,150 @@ class TestClickCommands:
         assert "Resetting database..." in result.output
         assert "Database reset complete." in result.output
 
+    # Add missing tables, columns and indexes with migrate-db command
+    def test_migrate_db(self, app):
+        runner = app.test_cli_runner()
+
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("DROP INDEX ix_report_user_id_timestamp_id")
+            connection.exec_driver_sql("DROP TABLE ranking_state")
+            connection.exec_driver_sql("ALTER TABLE report DROP COLUMN comment_count")
+
+        result = runner.invoke(args=["migrate-db"])
+        assert result.exit_code == 0
+        assert "Added table ranking_state" in result.output
+        assert "Added column report.comment_count" in result.output
+        assert "Added index ix_report_user_id_timestamp_id" in result.output
+        assert db.session.get(Report, 1).comment_count == 1
+        assert User.query.count() == RESOURCE_AMOUNT + 1
+
+        result = runner.invoke(args=["migrate-db"])
+        assert "Database is up to date." in result.output
+
+    # Rebuild drifted report counters with rebuild-counts command
+    def test_rebuild_counts(self, app):
+        runner = app.test_cli_runner()
+
+        report = db.session.get(Report, 1)
+        report.upvote_count = 10
+        report.comment_count = 10
+        db.session.commit()
+
+        result = runner.invoke(args=["rebuild-counts"])
+        assert result.exit_code == 0
+        assert "Report counters rebuilt." in result.output
+        report = db.session.get(Report, 1)
+        assert report.upvote_count == 1
+        assert report.comment_count == 1
+
+    # Import users, report types, reports and comments with import command
+    def test_import(self, app, client, tmp_path):
+        runner = app.test_cli_runner()
+        exported = client.get("/api/reports/export/?report_type=1").data.decode()
+        exported = exported.replace('"id":1,', '"id":100,')
+        records = [
+            {"type": "user", "name": "imported-user"},
+            {"type": "report_type", "name": "imported-type", "description": "test"},
+            {"type": "report", "id": 200, "user_name": "imported-user",
+             "report_type": "imported-type", "description": "imported",
+             "location": "test", "timestamp": "2020-01-01T12:00:00+02:00"},
+            {"type": "comment", "report_id": 200, "user_name": "imported-user", "text": "a"},
+            {"type": "comment", "report_id": 100, "user_name": "test-user-2", "text": "b"},
+            {"type": "comment", "report_id": 999, "text": "missing report"},
+            {"type": "report", "description": "no location"},
+        ]
+        path = tmp_path / "import.ndjson.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.write(exported)
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+            file.write("not json\n")
+            file.write(json.dumps({**records[2], "id": 201, "user_name": "nobody"}) + "\n")
+            file.write(json.dumps({**records[2], "id": 202, "report_type": "nothing"}) + "\n")
+            upvote = {"type": "upvote", "report_id": 200, "user_name": "imported-user"}
+            file.write(json.dumps(upvote) + "\n" + json.dumps(upvote) + "\n")
+
+        result = runner.invoke(args=["import", str(path), "--batch-size", "2"])
+        assert result.exit_code == 0, result.output
+        assert "Imported 1 users, 1 report types, 2 reports, 2 comments and 1 upvotes" in result.output
+        assert "Skipped line 8:" in result.output
+        assert "Skipped line 9:" in result.output
+        assert "Skipped line 10: unknown user 'nobody'" in result.output
+        assert "Skipped line 11: unknown report type 'nothing'" in result.output
+        assert "Skipped 1 comments and upvotes of missing reports" in result.output
+
+        report = db.session.get(Report, 200)
+        assert report.user.name == "imported-user"
+        assert report.report_type.name == "imported-type"
+        assert report.timestamp == datetime(2020, 1, 1, 10)
+        assert report.comment_count == 1
+        copy = db.session.get(Report, 100)
+        assert copy.serialize(True)["user_name"] == "test-user-1"
+        assert copy.comment_count == 1
+        listed = json.loads(client.get("/api/reports/").data)
+        assert [item["id"] for item in listed][-1] == 200
+
+    # Import fails on ids that are already taken
+    def test_import_duplicate_id(self, app, tmp_path):
+        runner = app.test_cli_runner()
+        path = tmp_path / "import.ndjson"
+        path.write_text(json.dumps({"id": 1, "description": "test", "location": "test"}))
+        result = runner.invoke(args=["import", str(path)])
+        assert result.exit_code != 0
+        assert "Import failed" in result.output
+        assert Report.query.count() == RESOURCE_AMOUNT
+
+    # Batches committed before a failed one get their counters and ETags updated
+    def test_import_failure_updates_counts(self, app, client, tmp_path):
+        runner = app.test_cli_runner()
+        etag = client.get("/api/reports/1/").headers["ETag"]
+        comment_count = db.session.get(Report, 1).comment_count
+        path = tmp_path / "import.ndjson"
+        path.write_text("\n".join([
+            json.dumps({"type": "comment", "report_id": 1, "text": "imported"}),
+            json.dumps({"id": 1, "description": "test", "location": "test"}),
+        ]))
+        result = runner.invoke(args=["import", str(path), "--batch-size", "1"])
+        assert result.exit_code != 0
+        db.session.expire_all()
+        assert db.session.get(Report, 1).comment_count == comment_count + 1
+        resp = client.get("/api/reports/1/", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+
+    # Generate a seeded dataset with seed-db command
+    def test_seed_db(self, app, client):
+        runner = app.test_cli_runner()
+        args = ["seed-db", "--reports", "200", "--users", "30", "--end", "2026-01-01"]
+
+        result = runner.invoke(args=args)
+        assert result.exit_code == 0, result.output
+        assert "Imported 30 users, 10 report types, 200 reports" in result.output
+        assert "Database seeded." in result.output
+        first = client.get("/api/reports/export/").data
+        upvote_total = db.session.scalar(db.select(db.func.sum(Report.upvote_count)))
+        assert upvote_total == db.session.scalar(db.select(db.func.count()).select_from(upvotes))
+        assert db.session.get(Report, 200).timestamp == datetime(2026, 1, 1)
+
+        runner.invoke(args=args)
+        assert client.get("/api/reports/export/").data == first
+        runner.invoke(args=args + ["--seed", "1"])
+        assert client.get("/api/reports/export/").data != first
+
+    # The exported spec is served as is in prebuilt mode
+    def test_export_openapi(self, app, client, tmp_path):
+        path = str(tmp_path / "openapi.json")
+        result = app.test_cli_runner().invoke(args=["export-openapi", "--output", path])
+        assert result.exit_code == 0
+        assert f"paths to {path}" in result.output
+
+        config = {"SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+                  "TESTING": True, "OPENAPI_SPEC_FILE": path}
+        prebuilt = create_app({**config, "SWAGGER_MODE": "prebuilt"}).test_client()
+        assert prebuilt.get("/apispec_1.json").json == client.get("/apispec_1.json").json
+        disabled = create_app({**config, "SWAGGER_MODE": "disabled"}).test_client()
+        assert disabled.get("/apidocs/").status_code == 404
+        assert disabled.get("/api/reports/").status_code == 200
+
     # Create admin user with default name
     def test_create_admin_user_valid(self, app):
         runner = app.test_cli_runner()